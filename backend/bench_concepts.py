@@ -0,0 +1,142 @@
+"""
+Concept clustering speed and correctness on large feedback histories.
+
+    python bench_concepts.py --entries 10000
+
+Builds a synthetic history of phrase variants (case, punctuation,
+qualifiers, typos, paraphrases) and times cluster_concepts against a plain
+Counter over the same strings. Since each variant's underlying concept is
+known, it also checks the clustering: every concept should come out as one
+cluster holding only its own variants. Exits non-zero when purity or
+completeness falls below --min-score.
+"""
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+from concepts import cluster_concepts, top_concepts
+
+BASE = [
+    "vocabulary", "verb conjugation", "listening comprehension", "pronunciation",
+    "sentence structure", "gender agreement", "past tense", "formal greetings",
+    "numbers and counting", "question words", "reading comprehension", "accent marks",
+    "reflexive verbs", "prepositions", "food vocabulary", "telling time",
+]
+QUALIFIERS = ["", "basic ", "advanced ", "understanding ", "using ", "recognizing "]
+SUFFIXES = ["", " in context", " from the video", " skills", "."]
+# Other ways feedback names some of the concepts. None of these phrases
+# appear in concepts.py; they merge only if its word-level rules generalize
+# (currently "accents" stays apart from "accent marks")
+PARAPHRASES = {
+    "vocabulary": ["word memory", "remembering new words", "lexical recall", "vocab"],
+    "listening comprehension": ["listening", "listening skills"],
+    "reading comprehension": ["reading", "reading skills"],
+    "verb conjugation": ["verb conjugations", "conjugating verbs"],
+    "past tense": ["the past tense", "past tense forms"],
+    "accent marks": ["accents", "written accent marks"],
+    "telling time": ["telling the time", "time telling"],
+}
+# Phrasings that must land in the same concept, and ones that must not
+SAME = [
+    ("vocabulary", "word memory"), ("vocabulary", "Vocabulry"), ("Question words", "question word"),
+    ("listening", "listening comprehension"), ("reading skills", "reading comprehension"),
+]
+DIFFERENT = [
+    ("listening comprehension", "reading comprehension"), ("past tense verbs", "present tense verbs"),
+    ("vocabulary", "food vocabulary"), ("verb conjugation", "reflexive verbs"),
+]
+
+
+def variant(rng: random.Random, phrase: str) -> str:
+    if phrase in PARAPHRASES and rng.random() < 0.3:
+        phrase = rng.choice(PARAPHRASES[phrase])
+    text = rng.choice(QUALIFIERS) + phrase + rng.choice(SUFFIXES)
+    if rng.random() < 0.2:
+        i = rng.randrange(len(text))
+        text = text[:i] + text[i + 1:]
+    if rng.random() < 0.3:
+        text = text.capitalize()
+    return text
+
+
+def score(concepts: list, sources: dict) -> tuple:
+    """
+    (purity, completeness) of `concepts` against `sources` ({text: Counter of
+    underlying concepts}): the share of entries in a cluster whose majority
+    concept they belong to, and the share in the cluster holding most of
+    their concept.
+    """
+    clusters = []
+    for concept in concepts:
+        by_base = Counter()
+        for text in concept["members"]:
+            by_base.update(sources.get(text, {}))
+        clusters.append(by_base)
+    total = sum(sum(c.values()) for c in clusters) or 1
+    purity = sum(max(c.values(), default=0) for c in clusters) / total
+    bases = {base for c in clusters for base in c}
+    completeness = sum(max(c[base] for c in clusters) for base in bases) / total
+    return purity, completeness
+
+
+def check_pairs() -> list:
+    """
+    The SAME / DIFFERENT pairs cluster_concepts gets wrong, with the first
+    phrase the more common one.
+    """
+    wrong = []
+    for pairs, merged in ((SAME, True), (DIFFERENT, False)):
+        for a, b in pairs:
+            if (len(cluster_concepts({a: 5, b: 1})) == 1) != merged:
+                wrong.append(f"{a!r} and {b!r} {'not ' if merged else ''}merged")
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-score", type=float, default=0.98, help="lowest acceptable purity and completeness")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sources = {}
+    history = []
+    for _ in range(args.entries):
+        base = rng.choice(BASE)
+        text = variant(rng, base)
+        sources.setdefault(text, Counter())[base] += 1
+        history.append(text)
+    counts = Counter(history)
+    print(f"{args.entries} entries, {len(counts)} distinct strings, {len(BASE)} underlying concepts")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        concepts = cluster_concepts(counts)
+        timings.append(time.perf_counter() - start)
+    print(f"cluster_concepts: {min(timings) * 1000:.1f} ms (best of {args.repeat}), {len(concepts)} concepts")
+
+    start = time.perf_counter()
+    Counter(history).most_common(3)
+    print(f"Counter.most_common: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("top 3 exact strings:", [s for s, _ in counts.most_common(3)])
+    print("top 3 concepts:     ", top_concepts(counts))
+    for concept in concepts[:5]:
+        print(f"  {concept['count']:>5}  {concept['label']}  ({len(concept['members'])} variants)")
+
+    purity, completeness = score(concepts, sources)
+    print(f"purity {purity:.3f}, completeness {completeness:.3f}, {len(concepts)} concepts for {len(BASE)}")
+    wrong = check_pairs()
+    for problem in wrong:
+        print(f"  wrong: {problem}")
+    if min(purity, completeness) < args.min_score or wrong:
+        print(f"clustering below --min-score {args.min_score}" if not wrong else "clustering pairs wrong")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Local stand-ins for TwelveLabs and OpenRouter, for benchmarks and offline runs.
+
+FakeTwelveLabs mimics the parts of AsyncTwelveLabs the backend uses
+(indexes, tasks, analyze_stream, gist); FakeOpenRouter serves
+/api/v1/chat/completions (plain and streamed) on a local port. Both take a
+latency, a jitter and a failure rate so upstream behaviour can be varied.
+"""
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from twelvelabs.core.api_error import ApiError
+
+CHUNK_CHARS = 40
+
+
+class _Upstream:
+    def __init__(self, latency: float, jitter: float, failure_rate: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self) -> bool:
+        self.calls += 1
+        if self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+
+def _question_bank(size: int) -> list:
+    return [
+        {
+            "question": f"¿Qué significa la palabra número {i} del vídeo?",
+            "options": [f"opción {i}-{j}" for j in range(4)],
+            "correctAnswer": i % 4,
+        }
+        for i in range(size)
+    ]
+
+
+def _feedback(attempt: int | None = None) -> dict:
+    feedback = {
+        "strengths": ["Greetings vocabulary", "Listening for numbers"],
+        "areas_to_improve": ["Past tense verbs", "Gender agreement"],
+        "tips": ["Rewatch the café scene and repeat each order aloud"],
+        "encouragement": "Good progress - keep going!",
+    }
+    return feedback if attempt is None else {"attempt": attempt, **feedback}
+
+
+def twelvelabs_response(prompt: str) -> str:
+    """
+    Plausible JSON text for one of the backend's TwelveLabs analysis prompts.
+    """
+    bank = re.search(r"generate exactly (\d+) multiple choice", prompt)
+    if bank:
+        return json.dumps(_question_bank(int(bank[1])), ensure_ascii=False)
+    batch = re.search(r"each of the (\d+) quiz attempts", prompt)
+    if batch:
+        return json.dumps([_feedback(i) for i in range(int(batch[1]))], ensure_ascii=False)
+    return json.dumps(_feedback(), ensure_ascii=False)
+
+
+def openrouter_response(prompt: str) -> str:
+    """
+    Plausible JSON text for the backend's learning-plan and Frenzy prompts.
+    """
+    day = re.search(r"\{\"day\": (\d+), \"title\": \"([^\"]*)\"", prompt)
+    if day:
+        body = "**Vocabulary:** hola - hello<br/>" * 20 + "Practice introducing yourself. " * 30
+        return json.dumps({"day": int(day[1]), "title": day[2], "body": body})
+    return json.dumps({
+        "top_strengths": ["Vocabulary", "Listening", "Pronunciation"],
+        "top_areas_to_improve": ["Past tense", "Gender agreement", "Prepositions"],
+        "learning_recommendations": ["Review verb tables daily", "Shadow native audio", "Write short diaries"],
+        "next_steps": "Focus on the past tense with short daily drills.",
+        "overall_assessment": "Steady progress across quizzes.",
+    })
+
+
+class FakeTwelveLabs:
+    """
+    Drop-in for services.client. Indexing takes `index_seconds`; every other
+    call takes `latency` (+/- `jitter`) and fails with a 429 ApiError at
+    `failure_rate`. Streams emit CHUNK_CHARS characters every `chunk_interval`.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, failure_rate: float = 0.0,
+                 index_seconds: float = 2.0, chunk_interval: float = 0.01, seed: int = 0):
+        upstream = _Upstream(latency, jitter, failure_rate, seed)
+        self.upstream = upstream
+        self.index_seconds = index_seconds
+        self.chunk_interval = chunk_interval
+        self.indexes = _FakeIndexes(upstream)
+        self.tasks = _FakeTasks(upstream, index_seconds)
+
+    async def _call(self):
+        await asyncio.sleep(self.upstream.delay())
+        if self.upstream.should_fail():
+            raise ApiError(status_code=429, body={"code": "too_many_requests", "message": "Fake rate limit"})
+
+    async def analyze_stream(self, video_id: str, prompt: str, **kwargs):
+        await self._call()
+        text = twelvelabs_response(prompt)
+        for i in range(0, len(text), CHUNK_CHARS):
+            if i:
+                await asyncio.sleep(self.chunk_interval)
+            yield SimpleNamespace(event_type="text_generation", text=text[i:i + CHUNK_CHARS])
+
+    async def gist(self, video_id: str, types: list, **kwargs):
+        await self._call()
+        return SimpleNamespace(title=f"Video {video_id[:8]}", topics=["Greetings", "Food"], hashtags=["#spanish"])
+
+
+class _FakeIndexes:
+    def __init__(self, upstream: _Upstream):
+        self.upstream = upstream
+        self.created = []
+
+    async def list(self, **kwargs):
+        await asyncio.sleep(self.upstream.delay())
+        created = list(self.created)
+
+        async def pages():
+            for index in created:
+                yield index
+        return pages()
+
+    async def create(self, index_name: str = None, name: str = None, **kwargs):
+        await asyncio.sleep(self.upstream.delay())
+        index = SimpleNamespace(id=f"idx_{uuid.uuid4().hex[:12]}", index_name=index_name or name)
+        self.created.append(index)
+        return index
+
+
+class _FakeTasks:
+    def __init__(self, upstream: _Upstream, index_seconds: float):
+        self.upstream = upstream
+        self.index_seconds = index_seconds
+        self._ready_at: dict[str, float] = {}
+
+    async def create(self, index_id: str, **source):
+        await asyncio.sleep(self.upstream.delay())
+        if self.upstream.should_fail():
+            raise ApiError(status_code=429, body={"code": "too_many_requests", "message": "Fake rate limit"})
+        task_id = f"task_{uuid.uuid4().hex[:12]}"
+        self._ready_at[task_id] = time.monotonic() + self.index_seconds
+        return SimpleNamespace(id=task_id)
+
+    async def retrieve(self, task_id: str, **kwargs):
+        await asyncio.sleep(self.upstream.delay() / 4)
+        ready = time.monotonic() >= self._ready_at.get(task_id, 0)
+        return SimpleNamespace(
+            id=task_id,
+            status="ready" if ready else "indexing",
+            video_id=f"vid_{task_id[5:]}" if ready else None,
+        )
+
+
+class FakeOpenRouter:
+    """
+    OpenRouter's chat completions endpoint on 127.0.0.1:`port`, in a
+    background thread. Failures (at `failure_rate`, plus the next `fail_next`
+    requests) answer 503 with Retry-After: 1. `connections` holds the client
+    address of every connection a request arrived on, to check reuse.
+    """
+
+    def __init__(self, port: int = 8799, latency: float = 0.5, jitter: float = 0.1,
+                 failure_rate: float = 0.0, chunk_interval: float = 0.01, seed: int = 0):
+        self.port = port
+        self.upstream = _Upstream(latency, jitter, failure_rate, seed)
+        self.chunk_interval = chunk_interval
+        self.fail_next = 0
+        self.requests = 0
+        self.connections: set = set()
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    def app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.post("/api/v1/chat/completions")
+        async def chat_completions(request: Request):
+            payload = await request.json()
+            self.requests += 1
+            self.connections.add((request.client.host, request.client.port))
+            await asyncio.sleep(self.upstream.delay())
+            if self.fail_next > 0 or self.upstream.should_fail():
+                self.fail_next = max(0, self.fail_next - 1)
+                return JSONResponse({"error": {"message": "Fake overload"}}, status_code=503, headers={"Retry-After": "1"})
+            text = openrouter_response(payload["messages"][-1]["content"])
+            if not payload.get("stream"):
+                return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+            async def events():
+                for i in range(0, len(text), CHUNK_CHARS):
+                    if i:
+                        await asyncio.sleep(self.chunk_interval)
+                    yield f"data: {json.dumps({'choices': [{'delta': {'content': text[i:i + CHUNK_CHARS]}}]})}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return app
+
+    def start(self):
+        config = uvicorn.Config(self.app(), host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
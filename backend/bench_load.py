@@ -0,0 +1,283 @@
+"""
+Offline load test of the API with fake TwelveLabs and OpenRouter upstreams.
+
+    python bench_load.py --requests 200 --concurrency 20
+    python bench_load.py --scenarios feedback learning-plan --tl-failure-rate 0.05
+    python bench_load.py --compare bench_results/baseline.json
+
+Runs the FastAPI app in-process (httpx ASGI transport, lifespan included)
+with bench_fakes standing in for both upstreams, so no API keys or network
+are needed. Each scenario sends --requests requests at --concurrency and
+reports p50/p95/p99 latency and throughput. Results are written as JSON to
+bench_results/ (or --output); --compare prints the change against an
+earlier result and exits non-zero when a percentile or the throughput got
+worse by more than --threshold percent.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from bench_fakes import FakeOpenRouter, FakeTwelveLabs
+
+SCENARIOS = ("upload", "upload-url", "feedback", "learning-plan", "generate-frenzy")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, statuses: list, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    counts = {}
+    for status in statuses:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    ok = sum(1 for status in statuses if isinstance(status, int) and status < 400)
+    return {
+        "requests": len(statuses),
+        "ok": ok,
+        "errors": len(statuses) - ok,
+        "statuses": counts,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "throughput_rps": round(len(statuses) / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+class Scenarios:
+    """
+    One coroutine per endpoint; each returns the HTTP status of one request.
+    """
+
+    def __init__(self, client, args, rng: random.Random):
+        self.client = client
+        self.args = args
+        self.rng = rng
+        self.quiz_ids: list = []
+
+    async def setup(self, name: str):
+        if name == "feedback":
+            # Quizzes to answer, one per video; retried since the fake
+            # upstream may be failing on purpose
+            for i in range(self.args.videos):
+                for attempt in range(5):
+                    response = await self.client.get(f"/videos/bench_video_{i}/quiz")
+                    if response.status_code == 200:
+                        self.quiz_ids.append(response.json()["quiz_id"])
+                        break
+            if not self.quiz_ids:
+                raise RuntimeError(f"no quiz could be generated for the feedback scenario: {response.status_code}")
+
+    async def upload(self) -> int:
+        data = self.rng.randbytes(self.args.upload_kb * 1024)
+        response = await self.client.post("/upload", files={"file": ("bench.mp4", data, "video/mp4")})
+        return response.status_code
+
+    async def upload_url(self) -> int:
+        response = await self.client.post("/upload-url", data={"url": f"https://cdn.bench/{uuid.uuid4().hex}.mp4"})
+        return response.status_code
+
+    async def feedback(self) -> int:
+        answers = [self.rng.randrange(4) for _ in range(5)]
+        response = await self.client.post(
+            "/feedback",
+            json={"quiz_id": self.rng.choice(self.quiz_ids), "answers": answers, "learner_id": f"bench_{self.rng.randrange(50)}"},
+        )
+        return response.status_code
+
+    async def learning_plan(self) -> int:
+        history = [
+            {
+                "strengths": [self.rng.choice(["Vocabulary", "Listening", "Greetings"])],
+                "areas_to_improve": [self.rng.choice(["Past tense", "Prepositions", "Gender agreement"])],
+                "tips": ["Rewatch the video"],
+                "encouragement": "Keep going",
+            }
+            for _ in range(self.rng.randint(1, 10))
+        ]
+        response = await self.client.post(
+            "/learning-plan", json={"learner_id": f"bench_{uuid.uuid4().hex[:8]}", "feedback_history": history}
+        )
+        return response.status_code
+
+    async def generate_frenzy(self) -> int:
+        response = await self.client.post("/generate-frenzy", data={"language": self.rng.choice(self.args.frenzy_languages)})
+        return response.status_code
+
+
+async def run_scenario(scenarios: Scenarios, name: str, requests: int, concurrency: int) -> dict:
+    await scenarios.setup(name)
+    call = getattr(scenarios, name.replace("-", "_"))
+    slots = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            try:
+                status = await call()
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+async def run(args) -> dict:
+    import httpx
+    import services
+    import main
+
+    # The app logs every request at INFO; keep the table readable
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    services.client = FakeTwelveLabs(
+        latency=args.tl_latency, jitter=args.tl_latency / 4, failure_rate=args.tl_failure_rate,
+        index_seconds=args.index_seconds, seed=args.seed,
+    )
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            scenarios = Scenarios(client, args, rng)
+            for name in args.scenarios:
+                results[name] = await run_scenario(scenarios, name, args.requests, args.concurrency)
+                print_row(name, results[name])
+    return results
+
+
+def print_row(name: str, r: dict):
+    print(
+        f"{name:<16} {r['requests']:>6} {r['errors']:>6} {r['p50_ms']:>10.1f} {r['p95_ms']:>10.1f} "
+        f"{r['p99_ms']:>10.1f} {r['throughput_rps']:>10.1f}"
+    )
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Print the change per scenario against `baseline`; True if anything regressed.
+    """
+    regressed = False
+    print(f"\nvs {baseline.get('label')} ({baseline.get('git_rev')}, {baseline.get('timestamp')}):")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            print(f"  {name}: not in baseline")
+            continue
+        changes = []
+        for key, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            if not before[key]:
+                continue
+            delta = (result[key] - before[key]) / before[key] * 100
+            worse = delta > threshold if higher_is_worse else delta < -threshold
+            regressed |= worse
+            changes.append(f"{key} {delta:+.1f}%{' REGRESSION' if worse else ''}")
+        print(f"  {name}: " + ", ".join(changes))
+    return regressed
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--tl-latency", type=float, default=0.2, help="seconds per TwelveLabs call")
+    parser.add_argument("--tl-failure-rate", type=float, default=0.0)
+    parser.add_argument("--index-seconds", type=float, default=1.0, help="time for a fake indexing task to finish")
+    parser.add_argument("--or-latency", type=float, default=0.3, help="seconds per OpenRouter call")
+    parser.add_argument("--or-failure-rate", type=float, default=0.0)
+    parser.add_argument("--or-port", type=int, default=8799)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--videos", type=int, default=5, help="distinct quizzes the feedback scenario answers")
+    parser.add_argument("--frenzy-languages", nargs="+", default=["Spanish", "French", "Italian"])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logs")
+    parser.add_argument("--label", default="bench")
+    parser.add_argument("--output", help="result file (default: bench_results/<label>-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+
+    # Everything the app persists goes to a throwaway directory, and the
+    # app talks to the fakes. Set before the backend modules are imported;
+    # render workers inherit it.
+    data_dir = tempfile.mkdtemp(prefix="bench_load_")
+    openrouter = FakeOpenRouter(
+        port=args.or_port, latency=args.or_latency, jitter=args.or_latency / 4,
+        failure_rate=args.or_failure_rate, seed=args.seed,
+    )
+    os.environ.update({
+        "DATA_DIR": data_dir,
+        "UPLOAD_SPOOL_DIR": os.path.join(data_dir, "spool"),
+        "TL_API_KEY": "bench",
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": openrouter.base_url,
+        "OPENROUTER_HTTP2": "0",
+        "FRENZY_IN_MEMORY": "1",
+        "TASK_POLL_INITIAL_DELAY": str(min(args.index_seconds, 5.0)),
+        "CATALOG_STORAGE": "none",
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    print(f"{'scenario':<16} {'reqs':>6} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'req/s':>10}")
+    openrouter.start()
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        openrouter.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report = {
+        "label": args.label,
+        "timestamp": timestamp,
+        "git_rev": git_rev(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "label", "verbose")},
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.label}-{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Frenzy PDF render throughput at different pool sizes.
+
+    python bench_render.py --renders 24 --workers 1 2 4
+
+Renders synthetic 12-day guides (no LLM calls) into a temp directory and
+prints renders/second per worker count. Every guide has distinct content so
+nothing comes from the page-fragment cache; pass --cached to time assembly
+from already-rendered fragments instead.
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+# Keep page fragments out of the real data dir. Spawned workers re-import
+# this module, so they must reuse the parent's directory rather than make one.
+if "BENCH_RENDER_DATA_DIR" not in os.environ:
+    os.environ["BENCH_RENDER_DATA_DIR"] = tempfile.mkdtemp(prefix="bench_render_")
+os.environ["DATA_DIR"] = os.environ["BENCH_RENDER_DATA_DIR"]
+
+from render_pool import RenderPool, RenderQueueFull  # noqa: E402
+from frenzy_render import render_frenzy_pdf  # noqa: E402
+
+
+def sample_days(variant: str = "") -> list:
+    body = "**Vocabulary:** hola - hello\n" * 20 + "Practice introducing yourself. " * 30
+    return [{"day": day, "title": f"Topic {day} {variant}", "body": body} for day in range(1, 13)]
+
+
+async def run(workers: int, renders: int, out_dir: str, cached: bool) -> float:
+    pool = RenderPool(max_workers=workers, queue_size=renders)
+    pool.start()
+    try:
+        # Warm every worker so process start-up is not timed
+        await asyncio.gather(*(
+            pool.submit(render_frenzy_pdf, "Bench", sample_days("warm"), os.path.join(out_dir, f"warm_{i}.pdf"))
+            for i in range(workers)
+        ))
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            pool.submit(
+                render_frenzy_pdf,
+                "Bench",
+                sample_days("warm" if cached else f"{workers}-{i}"),
+                os.path.join(out_dir, f"bench_{workers}_{i}.pdf"),
+            )
+            for i in range(renders)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.stop()
+    return renders / elapsed
+
+
+async def check_backpressure(out_dir: str):
+    pool = RenderPool(max_workers=1, queue_size=1)
+    days = sample_days()
+    tasks = [
+        asyncio.create_task(pool.submit(render_frenzy_pdf, "Bench", days, os.path.join(out_dir, f"bp_{i}.pdf")))
+        for i in range(3)
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    pool.stop()
+    rejected = [r for r in results if isinstance(r, RenderQueueFull)]
+    print(f"Backpressure: {len(rejected)}/3 rejected (capacity 2), retry_after={rejected[0].retry_after if rejected else '-'}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=12)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--cached", action="store_true", help="reuse rendered page fragments")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}, renders per run: {args.renders}, cached fragments: {args.cached}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        baseline = None
+        for workers in args.workers:
+            rate = await run(workers, args.renders, out_dir, args.cached)
+            baseline = baseline or rate
+            print(f"workers={workers:<3} {rate:6.2f} renders/s  ({rate / baseline:.2f}x)")
+        await check_backpressure(out_dir)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(os.environ["DATA_DIR"], ignore_errors=True)
@@ -0,0 +1,313 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+
+import dedup
+import store
+import quiz_store
+import catalog_storage
+from limits import UpstreamBusy
+from services import (
+    QUIZ_SIZE,
+    generate_gist,
+    generate_question_bank,
+    get_or_create_index,
+    run_blocking,
+    upload_video_file,
+    upload_video_url,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between catalog sweeps (0 = never warm in the background)
+CATALOG_WARM_INTERVAL = int(os.getenv("CATALOG_WARM_INTERVAL", "900"))
+# Catalog videos indexed at once
+CATALOG_WARM_CONCURRENCY = int(os.getenv("CATALOG_WARM_CONCURRENCY", "2"))
+# A video that failed to warm is retried after this long
+CATALOG_RETRY_AFTER = int(os.getenv("CATALOG_RETRY_AFTER", "3600"))
+# Lifetime of the URLs handed to TwelveLabs for indexing
+CATALOG_INDEX_URL_TTL = 6 * 3600
+# /catalog: signed URL lifetime, how long before expiry they are re-signed,
+# paths per signing request, and how long the bucket listing is reused
+CATALOG_URL_TTL = int(os.getenv("CATALOG_URL_TTL", "3600"))
+CATALOG_URL_MARGIN = int(os.getenv("CATALOG_URL_MARGIN", "300"))
+CATALOG_SIGN_BATCH = 100
+CATALOG_LIST_TTL = int(os.getenv("CATALOG_LIST_TTL", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_videos (
+    name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    url_key TEXT,
+    index_id TEXT,
+    video_id TEXT,
+    bank TEXT,
+    gist TEXT,
+    error TEXT,
+    warmed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS catalog_videos_url_key ON catalog_videos (url_key);
+"""
+
+
+def _rows() -> dict:
+    conn = store.connect(SCHEMA)
+    return {
+        name: {"version": version, "index_id": index_id, "error": error, "warmed_at": warmed_at}
+        for name, version, index_id, error, warmed_at in conn.execute(
+            "SELECT name, version, index_id, error, warmed_at FROM catalog_videos"
+        )
+    }
+
+
+def _save(name: str, version: str, url_key: str | None, index_id: str | None = None, video_id: str | None = None,
+          bank: list | None = None, gist: dict | None = None, error: str | None = None):
+    store.connect(SCHEMA).execute(
+        "INSERT OR REPLACE INTO catalog_videos "
+        "(name, version, url_key, index_id, video_id, bank, gist, error, warmed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            name, version, url_key, index_id, video_id,
+            json.dumps(bank) if bank is not None else None,
+            json.dumps(gist) if gist is not None else None,
+            error, time.time(),
+        ),
+    )
+
+
+def _lookup(url_key: str, index_id: str) -> dict | None:
+    row = store.connect(SCHEMA).execute(
+        "SELECT name, video_id, bank, gist FROM catalog_videos "
+        "WHERE url_key = ? AND index_id = ? AND error IS NULL AND video_id IS NOT NULL",
+        (url_key, index_id),
+    ).fetchone()
+    if not row:
+        return None
+    return {"name": row[0], "video_id": row[1], "bank": json.loads(row[2]), "gist": json.loads(row[3])}
+
+
+def _gists() -> dict:
+    """
+    {name: (video_id, gist)} for every warmed catalog video.
+    """
+    conn = store.connect(SCHEMA)
+    return {
+        name: (video_id, json.loads(gist))
+        for name, video_id, gist in conn.execute(
+            "SELECT name, video_id, gist FROM catalog_videos WHERE error IS NULL AND gist IS NOT NULL"
+        )
+    }
+
+
+async def quiz_and_gist(url: str, learner_id: str | None = None) -> tuple | None:
+    """
+    (video_id, quiz, gist) for a pre-indexed catalog video, straight from the
+    warmer's results; None if `url` is not a warmed catalog item.
+    """
+    index_id = await get_or_create_index()
+    entry = await run_blocking(_lookup, dedup.url_key(url), index_id)
+    if entry is None:
+        return None
+    quiz = await run_blocking(quiz_store.sample, entry["video_id"], entry["bank"], QUIZ_SIZE, learner_id)
+    return entry["video_id"], quiz, entry["gist"]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CatalogWarmer:
+    """
+    Background sweep that indexes catalog videos ahead of time and keeps
+    their video_id, question bank and gist, so picking one is instant.
+    """
+
+    def __init__(self, interval: int = CATALOG_WARM_INTERVAL, concurrency: int = CATALOG_WARM_CONCURRENCY):
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.storage: catalog_storage.CatalogStorage | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def start(self, storage: catalog_storage.CatalogStorage | None):
+        self.storage = storage
+        if storage is None or self.interval <= 0:
+            logger.info("[CATALOG] Background warming disabled")
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.warning(f"[CATALOG] Warm sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def warm(self) -> dict:
+        """
+        One sweep: warm every catalog video that is new, changed, indexed into
+        another index, or due for a retry. Returns counts per outcome.
+        """
+        # A manual sweep waits for the scheduled one instead of duplicating it
+        async with self._lock:
+            return await self._sweep()
+
+    async def _sweep(self) -> dict:
+        start = time.perf_counter()
+        objects = await self.storage.list_objects()
+        index_id = await get_or_create_index()
+        known = await run_blocking(_rows)
+        now = time.time()
+
+        def due(obj):
+            row = known.get(obj.name)
+            if row is None or row["version"] != obj.version:
+                return True
+            if row["error"]:
+                return now - row["warmed_at"] >= CATALOG_RETRY_AFTER
+            return row["index_id"] != index_id
+
+        todo = [obj for obj in objects if due(obj)]
+        if not todo:
+            return {"catalog": len(objects), "warmed": 0, "failed": 0}
+
+        logger.info(f"[CATALOG] Warming {len(todo)} of {len(objects)} catalog videos")
+        urls = await self.storage.sign([obj.name for obj in todo], CATALOG_INDEX_URL_TTL)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm_one(obj):
+            async with semaphore:
+                return await self._warm(obj, urls.get(obj.name))
+
+        results = await asyncio.gather(*(warm_one(obj) for obj in todo))
+        warmed = sum(results)
+        logger.info(
+            f"[CATALOG] Sweep took {time.perf_counter() - start:.2f}s: "
+            f"{warmed} warmed, {len(todo) - warmed} failed"
+        )
+        return {"catalog": len(objects), "warmed": warmed, "failed": len(todo) - warmed}
+
+    async def _warm(self, obj: catalog_storage.CatalogObject, url: str | None) -> bool:
+        url_key = dedup.url_key(url) if url else None
+        try:
+            if url is None:
+                raise RuntimeError("could not get a URL for this video")
+            path = self.storage.local_path(obj.name)
+            if path:
+                video_id = await upload_video_file(path, content_hash=await run_blocking(_file_sha256, path))
+            else:
+                video_id = await upload_video_url(url)
+            bank, gist = await asyncio.gather(generate_question_bank(video_id), generate_gist(video_id))
+            if not bank:
+                raise RuntimeError("no usable question bank")
+            # The index the video went into (refreshed if indexing had to recreate it)
+            index_id = await get_or_create_index()
+            await run_blocking(_save, obj.name, obj.version, url_key, index_id, video_id, bank, gist)
+            logger.info(f"[CATALOG] Warmed {obj.name} as {video_id} ({len(bank)} questions)")
+            return True
+        except UpstreamBusy as e:
+            # Not the video's fault: left unrecorded so the next sweep retries it
+            logger.info(f"[CATALOG] Deferring {obj.name}: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"[CATALOG] Could not warm {obj.name}: {e!r}")
+            await run_blocking(_save, obj.name, obj.version, url_key, None, None, None, None, repr(e))
+            return False
+
+
+def parse_video_filename(filename: str) -> tuple:
+    """
+    (displayName, language) from "<display name>_<language>.<ext>".
+    """
+    stem = filename.rsplit(".", 1)[0] if "." in filename else filename
+    name, sep, language = stem.rpartition("_")
+    if sep and name:
+        return name, language
+    return stem, "Unknown"
+
+
+class CatalogListing:
+    """
+    The catalog as served by /catalog: the storage listing (reused for
+    CATALOG_LIST_TTL), signed URLs created in batches and reused until
+    CATALOG_URL_MARGIN before they expire, and the warmer's gists.
+    """
+
+    def __init__(self):
+        self.storage: catalog_storage.CatalogStorage | None = None
+        self._objects: list = []
+        self._listed_at = 0.0
+        self._urls: dict[str, tuple[str, float]] = {}   # name -> (url, expires_at)
+        self._lock = asyncio.Lock()
+
+    def start(self, storage: catalog_storage.CatalogStorage | None):
+        self.storage = storage
+
+    async def _refresh(self) -> list:
+        """
+        Current objects, with a signed URL for each that is not about to expire.
+        """
+        async with self._lock:
+            now = time.time()
+            if now - self._listed_at >= CATALOG_LIST_TTL:
+                self._objects = await self.storage.list_objects()
+                self._listed_at = now
+                names = {obj.name for obj in self._objects}
+                self._urls = {name: entry for name, entry in self._urls.items() if name in names}
+
+            stale = [
+                obj.name for obj in self._objects
+                if obj.name not in self._urls or self._urls[obj.name][1] - now < CATALOG_URL_MARGIN
+            ]
+            if stale:
+                batches = [stale[i:i + CATALOG_SIGN_BATCH] for i in range(0, len(stale), CATALOG_SIGN_BATCH)]
+                signed = await asyncio.gather(*(self.storage.sign(batch, CATALOG_URL_TTL) for batch in batches))
+                for urls in signed:
+                    for name, url in urls.items():
+                        self._urls[name] = (url, now + CATALOG_URL_TTL)
+                logger.info(f"[CATALOG] Signed {len(stale)} URLs in {len(batches)} requests")
+            return self._objects
+
+    async def page(self, offset: int = 0, limit: int | None = None) -> dict:
+        objects = await self._refresh()
+        gists = await run_blocking(_gists)
+        window = objects[offset:offset + limit] if limit is not None else objects[offset:]
+        items = []
+        for obj in window:
+            if obj.name not in self._urls:
+                continue
+            display_name, language = parse_video_filename(obj.name)
+            video_id, gist = gists.get(obj.name, (None, {}))
+            items.append({
+                "name": obj.name,
+                "url": self._urls[obj.name][0],
+                "displayName": display_name,
+                "language": language,
+                "video_id": video_id,
+                "title": gist.get("title"),
+                "topics": gist.get("topics"),
+                "hashtags": gist.get("hashtags"),
+            })
+        return {"items": items, "total": len(objects), "offset": offset, "limit": limit}
+
+
+# App-wide instances, started with the app
+catalog_warmer = CatalogWarmer()
+catalog_listing = CatalogListing()
@@ -0,0 +1,170 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from dataclasses import dataclass
+from urllib.parse import quote
+
+import httpx
+
+from store import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Which adapter holds the video catalog: "supabase", "local" or "none".
+# Defaults to Supabase when SUPABASE_URL is set, else a local directory when
+# CATALOG_DIR is set.
+CATALOG_STORAGE = os.getenv("CATALOG_STORAGE", "")
+CATALOG_BUCKET = os.getenv("CATALOG_BUCKET", "rawVideos")
+CATALOG_DIR = os.getenv("CATALOG_DIR", "")
+# Public base URL the local directory is served from, if any (else file:// URLs)
+CATALOG_BASE_URL = os.getenv("CATALOG_BASE_URL", "")
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".m4v", ".webm", ".mkv", ".avi"}
+
+
+@dataclass
+class CatalogObject:
+    name: str
+    size: int
+    updated_at: str
+
+    @property
+    def version(self) -> str:
+        # Changes whenever the file is replaced under the same name
+        return f"{self.size}:{self.updated_at}"
+
+
+class CatalogStorage(ABC):
+    """
+    Where catalog videos live. Adapters list the objects and hand out URLs
+    TwelveLabs (and browsers) can fetch.
+    """
+
+    @abstractmethod
+    async def list_objects(self) -> list:
+        """
+        The video objects (CatalogObject) in the catalog.
+        """
+
+    @abstractmethod
+    async def sign(self, names: list, expires_in: int) -> dict:
+        """
+        {name: url valid for `expires_in` seconds}; names that could not be
+        signed are left out.
+        """
+
+    def local_path(self, name: str) -> str | None:
+        """
+        A path on this host, when the object can be uploaded as a file.
+        """
+        return None
+
+    async def close(self):
+        pass
+
+
+class SupabaseStorage(CatalogStorage):
+    """
+    A Supabase Storage bucket, through its REST API.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, url: str, key: str, bucket: str = CATALOG_BUCKET):
+        self.base = f"{url.rstrip('/')}/storage/v1"
+        self.bucket = bucket
+        self._client = httpx.AsyncClient(
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            timeout=httpx.Timeout(30.0, connect=10.0),
+        )
+
+    async def list_objects(self) -> list:
+        objects = []
+        offset = 0
+        while True:
+            response = await self._client.post(
+                f"{self.base}/object/list/{self.bucket}",
+                json={"prefix": "", "limit": self.PAGE_SIZE, "offset": offset, "sortBy": {"column": "name", "order": "asc"}},
+            )
+            response.raise_for_status()
+            page = response.json()
+            for entry in page:
+                # Folders have no id; skip anything that is not a video, as LocalStorage does
+                if entry.get("id") is None or os.path.splitext(entry["name"])[1].lower() not in VIDEO_EXTENSIONS:
+                    continue
+                metadata = entry.get("metadata") or {}
+                objects.append(CatalogObject(entry["name"], int(metadata.get("size") or 0), entry.get("updated_at") or ""))
+            if len(page) < self.PAGE_SIZE:
+                return objects
+            offset += len(page)
+
+    async def sign(self, names: list, expires_in: int) -> dict:
+        if not names:
+            return {}
+        response = await self._client.post(
+            f"{self.base}/object/sign/{self.bucket}",
+            json={"expiresIn": expires_in, "paths": list(names)},
+        )
+        response.raise_for_status()
+        urls = {}
+        for entry in response.json():
+            if entry.get("signedURL"):
+                urls[entry["path"]] = f"{self.base}{entry['signedURL']}"
+            else:
+                logger.warning(f"[CATALOG] Could not sign {entry.get('path')}: {entry.get('error')}")
+        return urls
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class LocalStorage(CatalogStorage):
+    """
+    Video files in a local directory (development and tests).
+    """
+
+    def __init__(self, directory: str, base_url: str = CATALOG_BASE_URL):
+        self.directory = Path(directory).resolve()
+        self.base_url = base_url.rstrip("/")
+
+    async def list_objects(self) -> list:
+        return await run_blocking(self._scan)
+
+    def _scan(self) -> list:
+        objects = []
+        for path in sorted(self.directory.iterdir()):
+            if path.is_file() and path.suffix.lower() in VIDEO_EXTENSIONS:
+                stat = path.stat()
+                objects.append(CatalogObject(path.name, stat.st_size, str(int(stat.st_mtime))))
+        return objects
+
+    async def sign(self, names: list, expires_in: int) -> dict:
+        if self.base_url:
+            return {name: f"{self.base_url}/{quote(name)}" for name in names}
+        return {name: (self.directory / name).as_uri() for name in names}
+
+    def local_path(self, name: str) -> str | None:
+        path = self.directory / name
+        return str(path) if path.is_file() else None
+
+
+def from_env() -> CatalogStorage | None:
+    """
+    The adapter configured through the environment, or None.
+    """
+    kind = CATALOG_STORAGE or ("supabase" if os.getenv("SUPABASE_URL") else "local" if CATALOG_DIR else "")
+    if kind == "supabase":
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        if not url or not key:
+            logger.warning("[CATALOG] SUPABASE_URL and SUPABASE_KEY are required for the supabase catalog")
+            return None
+        return SupabaseStorage(url, key)
+    if kind == "local":
+        if not CATALOG_DIR or not os.path.isdir(CATALOG_DIR):
+            logger.warning(f"[CATALOG] CATALOG_DIR is not a directory: {CATALOG_DIR!r}")
+            return None
+        return LocalStorage(CATALOG_DIR)
+    if kind and kind != "none":
+        logger.warning(f"[CATALOG] Unknown CATALOG_STORAGE: {kind!r}")
+    return None
@@ -0,0 +1,256 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Cosine similarity (over weighted core words) at or above which two phrases
+# count as the same concept. Cores must share nearly all their distinctive
+# words: "past tense verbs" + "present tense verbs" and "listening
+# comprehension" + "reading comprehension" stay apart
+CONCEPT_SIMILARITY = float(os.getenv("CONCEPT_SIMILARITY", "0.75"))
+# Hashed word features per phrase
+_DIMENSIONS = 1024
+_BLOCK = 256
+# A word one edit away from a word at least this many times as frequent is
+# taken as a misspelling of it
+_TYPO_FREQUENCY_RATIO = 2
+_TYPO_MIN_LENGTH = 2
+
+# Words that qualify a skill without changing which skill it is (trimmed
+# from labels too)
+_QUALIFIERS = {
+    "a", "an", "the", "of", "and", "in", "on", "for", "from", "with", "to", "your", "their", "new",
+    "basic", "advanced", "simple", "good", "strong", "solid", "great", "better", "correct", "correctly",
+    "understanding", "using", "recognizing", "identifying", "applying", "practicing", "knowledge",
+    "remembering", "retaining", "recalling", "memorizing",
+    "context", "video", "skill", "skills", "ability", "abilities", "use", "usage",
+}
+# How a skill is exercised: "reading comprehension" and "reading" name the
+# same skill, but the label keeps the word
+_ASPECTS = {"comprehension", "retention", "recall", "memory", "memorization"}
+# Words for the same thing, by the one used in cores
+_SYNONYMS = {
+    "vocab": "vocabulary", "word": "vocabulary", "words": "vocabulary", "lexicon": "vocabulary",
+    "lexical": "vocabulary", "term": "vocabulary", "terms": "vocabulary",
+}
+# Derivational endings folded together ("conjugation", "conjugating"),
+# longest first, from words of at least _STEM_MIN_LENGTH letters
+_SUFFIXES = ("ations", "ation", "ating", "ated", "ates", "ate", "ings", "ing", "ions", "ion")
+_STEM_MIN_LENGTH = 6
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split()).strip(" .!")
+
+
+def _words(text: str) -> list:
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """
+    True if `a` and `b` differ by one insertion, deletion, substitution or
+    swap of adjacent letters.
+    """
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    return a[i:] == b[i + 1:] if len(a) < len(b) else a[i + 1:] == b[i:]
+
+
+def _canonical_words(word_counts: dict) -> dict:
+    """
+    {word: tuple of canonical words}. Plurals and singulars fold together,
+    misspellings fold into a much more frequent word, two frequent words run
+    together are split, and single letters are dropped.
+    """
+    canonical, known, forms = {}, set(), []
+    for word in sorted(word_counts, key=word_counts.get, reverse=True):
+        if len(word) < 2:
+            canonical[word] = ()
+            continue
+        plural = next((other for other in (word[:-1], word + "s") if other in known), None)
+        if plural is not None and not word.endswith("ss"):
+            canonical[word] = (plural,)
+            # Misspellings of either form are caught below
+            forms.append(word)
+            continue
+        count = word_counts[word]
+        matches = []
+        if len(word) >= _TYPO_MIN_LENGTH:
+            matches = [
+                canonical[other][0] for other in forms
+                if word_counts[other] >= _TYPO_FREQUENCY_RATIO * count and _one_edit(word, other)
+            ]
+        if matches:
+            # When ambiguous, fold into a skill word rather than a qualifier
+            # (which would drop the word from the core)
+            canonical[word] = (next((m for m in matches if m not in _QUALIFIERS), matches[0]),)
+            continue
+        split = next(
+            (halves for halves in ((word[:i], word[i:]) for i in range(2, len(word) - 1))
+             if all(len(canonical.get(half, ())) == 1 and word_counts[half] >= _TYPO_FREQUENCY_RATIO * count
+                    for half in halves)),
+            None,
+        )
+        if split is not None:
+            canonical[word] = tuple(canonical[half][0] for half in split)
+            continue
+        known.add(word)
+        forms.append(word)
+        canonical[word] = (word,)
+    return canonical
+
+
+def _stem(word: str) -> str:
+    if len(word) >= _STEM_MIN_LENGTH:
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+                return word[:-len(suffix)]
+    return word
+
+
+def _label(words: list) -> str:
+    """
+    A phrase with its leading and trailing qualifiers trimmed, for display
+    ("recognizing numbers and counting in context" -> "numbers and counting").
+    """
+    start, end = 0, len(words)
+    while start < end and words[start] in _QUALIFIERS:
+        start += 1
+    while end > start and words[end - 1] in _QUALIFIERS:
+        end -= 1
+    return " ".join(words[start:end] or words)
+
+
+def _tfidf(cores: list) -> np.ndarray:
+    """
+    L2-normalised TF-IDF rows over hashed core words (float32, len(cores) x _DIMENSIONS).
+    """
+    rows, cols = [], []
+    for row, core in enumerate(cores):
+        for word in set(core.split()):
+            rows.append(row)
+            cols.append(zlib.crc32(word.encode("utf-8")) % _DIMENSIONS)
+    tf = np.zeros((len(cores), _DIMENSIONS), dtype=np.float32)
+    tf[np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)] = 1.0
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(cores)) / (1 + df)).astype(np.float32) + 1.0
+    tf = tf * idf
+    norms = np.linalg.norm(tf, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return tf / norms
+
+
+def cluster_concepts(counts: dict, threshold: float = CONCEPT_SIMILARITY) -> list:
+    """
+    Merge phrases ({text: count}) naming the same skill into concepts, most
+    frequent first: [{"label", "count", "members"}]. Phrases are reduced to
+    a core (plurals, misspellings, synonyms and word endings folded,
+    qualifiers dropped); a core joins the first more frequent core it is
+    `threshold`-similar to, otherwise it starts a new concept. Each concept
+    is labelled with its most common phrasing, qualifiers trimmed.
+    """
+    phrases = {}      # normalized text -> [count, original text, words]
+    for text, count in counts.items():
+        key = _normalize(text)
+        words = _words(key)
+        if not words:
+            continue
+        if key in phrases:
+            phrases[key][0] += count
+        else:
+            phrases[key] = [count, text.strip().rstrip(".!"), words]
+    if not phrases:
+        return []
+
+    word_counts = {}
+    for count, _, words in phrases.values():
+        for word in words:
+            word_counts[word] = word_counts.get(word, 0) + count
+    canonical = _canonical_words(word_counts)
+
+    cores = {}        # core -> [count, {label: count}, member texts]
+    for count, original, words in phrases.values():
+        folded = [_SYNONYMS.get(w, w) for word in words for w in canonical[word]]
+        # Repeats collapse ("vocabulary words" is just "vocabulary")
+        kept = [_stem(w) for w in folded if w not in _QUALIFIERS and w not in _ASPECTS]
+        core = " ".join(dict.fromkeys(kept)) or " ".join(folded)
+        if not core:
+            continue
+        entry = cores.setdefault(core, [0, {}, []])
+        entry[0] += count
+        label = _label(words)
+        entry[1][label] = entry[1].get(label, 0) + count
+        entry[2].append(original)
+    if not cores:
+        return []
+
+    # Leaders are picked in order of frequency so a concept starts from its most common core
+    keys = sorted(cores, key=lambda k: cores[k][0], reverse=True)
+    vectors = _tfidf(keys)
+    leader_rows = []          # row in `vectors` of each concept's leader
+    leaders = np.empty((0, _DIMENSIONS), dtype=np.float32)
+    assignment = np.empty(len(keys), dtype=np.intp)
+
+    for start in range(0, len(keys), _BLOCK):
+        block = vectors[start:start + _BLOCK]
+        # Against concepts from earlier blocks, in one matrix product
+        if len(leader_rows):
+            sims = block @ leaders.T
+            best = sims.argmax(axis=1)
+            matched = sims[np.arange(len(block)), best] >= threshold
+        else:
+            best = np.zeros(len(block), dtype=np.intp)
+            matched = np.zeros(len(block), dtype=bool)
+        assignment[start:start + len(block)][matched] = best[matched]
+
+        # The rest may lead new concepts or join one started earlier in this block
+        intra = block @ block.T
+        new_leaders = []
+        for i in np.flatnonzero(~matched):
+            joined = next((j for j in new_leaders if intra[i, j] >= threshold), None)
+            if joined is None:
+                new_leaders.append(i)
+                assignment[start + i] = len(leader_rows) + len(new_leaders) - 1
+            else:
+                assignment[start + i] = len(leader_rows) + new_leaders.index(joined)
+        if new_leaders:
+            leader_rows.extend(start + i for i in new_leaders)
+            leaders = np.vstack([leaders, block[new_leaders]])
+
+    weights = np.array([cores[k][0] for k in keys], dtype=np.int64)
+    totals = np.bincount(assignment, weights=weights, minlength=len(leader_rows)).astype(np.int64)
+    members = [[] for _ in leader_rows]
+    labels = [{} for _ in leader_rows]
+    for row, concept in enumerate(assignment):
+        _, label_counts, texts = cores[keys[row]]
+        members[concept].extend(texts)
+        for label, count in label_counts.items():
+            labels[concept][label] = labels[concept].get(label, 0) + count
+
+    concepts = []
+    for c in range(len(leader_rows)):
+        label = max(labels[c], key=labels[c].get)
+        concepts.append({"label": label[:1].upper() + label[1:], "count": int(totals[c]), "members": members[c]})
+    concepts.sort(key=lambda c: c["count"], reverse=True)
+    return concepts
+
+
+def top_concepts(phrases, limit: int = 3) -> list:
+    """
+    Labels of the `limit` most frequent concepts in `phrases` (a list of
+    strings or a {text: count} dict).
+    """
+    if not isinstance(phrases, dict):
+        counts = {}
+        for text in phrases:
+            if isinstance(text, str):
+                counts[text] = counts.get(text, 0) + 1
+        phrases = counts
+    return [c["label"] for c in cluster_concepts(phrases)[:limit]]
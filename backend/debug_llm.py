@@ -1,30 +1,30 @@
 import os
-import httpx
-import json
+import asyncio
 from dotenv import load_dotenv
 
+from openrouter import OpenRouterClient
+
 load_dotenv(dotenv_path=".env")
 print("Environment keys:", [k for k in os.environ.keys() if "KEY" in k or "TOKEN" in k])
 
-api_key = os.getenv("OPENROUTER_API_KEY")
-
 prompt = "Create a 1-day study plan for Italian. Return valid JSON."
 
+
+async def main():
+    async with OpenRouterClient() as client:
+        print("Sending request...")
+        response = await client.post_chat(
+            {
+                "model": "google/gemini-pro-1.5",
+                "messages": [{"role": "user", "content": prompt}],
+            },
+            timeout=60.0,
+        )
+        print(f"Status: {response.status_code} ({response.http_version})")
+        print(f"Response: {response.text}")
+
+
 try:
-    print("Sending request...")
-    response = httpx.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "model": "google/gemini-pro-1.5", 
-            "messages": [{"role": "user", "content": prompt}],
-        },
-        timeout=60.0
-    )
-    print(f"Status: {response.status_code}")
-    print(f"Response: {response.text}")
+    asyncio.run(main())
 except Exception as e:
     print(f"Error: {e}")
@@ -0,0 +1,80 @@
+import time
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import store
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_keys (
+    key TEXT PRIMARY KEY,
+    index_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Query params that only carry signatures/expiry; two signed URLs for the same
+# object differ only in these (Supabase uses `token`, S3/GCS/Azure the rest).
+_VOLATILE_PARAMS = {
+    "token", "expires", "signature", "key-pair-id", "policy",
+    "se", "sig", "sp", "st", "sv", "sr", "skoid", "sktid", "skt", "ske", "sks", "skv",
+}
+
+
+def content_key(sha256_hex: str) -> str:
+    return f"sha256:{sha256_hex}"
+
+
+def url_key(url: str) -> str:
+    return f"url:{normalize_url(url)}"
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a video URL: lowercase scheme/host, no default port,
+    no fragment, no signing params, remaining query sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _VOLATILE_PARAMS and not k.lower().startswith(("x-amz-", "x-goog-"))
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def lookup(key: str, index_id: str) -> str | None:
+    """
+    Return the video_id already indexed for `key` in `index_id`, if any.
+    Entries recorded against another index are stale and get dropped.
+    """
+    conn = store.connect(SCHEMA)
+    row = conn.execute("SELECT index_id, video_id FROM video_keys WHERE key = ?", (key,)).fetchone()
+    if not row:
+        return None
+    if row[0] != index_id:
+        conn.execute("DELETE FROM video_keys WHERE key = ?", (key,))
+        return None
+    return row[1]
+
+
+def remember(key: str, index_id: str, video_id: str):
+    store.connect(SCHEMA).execute(
+        "INSERT OR REPLACE INTO video_keys (key, index_id, video_id, created_at) VALUES (?, ?, ?, ?)",
+        (key, index_id, video_id, time.time()),
+    )
+
+
+def invalidate_except(index_id: str):
+    """
+    Drop every mapping that points into an index other than `index_id`
+    (called when INDEX_NAME is recreated).
+    """
+    cur = store.connect(SCHEMA).execute("DELETE FROM video_keys WHERE index_id != ?", (index_id,))
+    if cur.rowcount:
+        logger.info(f"[DEDUP] Invalidated {cur.rowcount} entries from previous indexes")
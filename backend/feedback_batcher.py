@@ -0,0 +1,110 @@
+import os
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from limits import UpstreamBusy
+from services import cached_feedback, generate_feedback, generate_feedback_batch
+
+logger = logging.getLogger(__name__)
+
+# How long a /feedback call waits for others on the same video to share its
+# TwelveLabs request, and the most attempts one request may carry (the
+# analyze prompt is length-limited)
+FEEDBACK_BATCH_WINDOW = float(os.getenv("FEEDBACK_BATCH_WINDOW_MS", "100")) / 1000
+FEEDBACK_BATCH_MAX = int(os.getenv("FEEDBACK_BATCH_MAX", "8"))
+
+
+@dataclass
+class _Attempt:
+    correct: list
+    wrong: list
+    futures: list = field(default_factory=list)
+
+
+class FeedbackBatcher:
+    """
+    Merges feedback requests for the same video that arrive within a short
+    window into one generate_feedback_batch call, and hands each caller its
+    own entry of the combined response.
+    """
+
+    def __init__(self, window: float = FEEDBACK_BATCH_WINDOW, max_batch: int = FEEDBACK_BATCH_MAX):
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        # Per video: attempts waiting for the window to close, keyed so that
+        # identical attempts share one slot
+        self._pending: dict[str, dict[str, _Attempt]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, video_id: str, correct_answers: list, wrong_answers: list) -> dict:
+        cached = await cached_feedback(video_id, correct_answers, wrong_answers)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = json.dumps([correct_answers, wrong_answers], sort_keys=True)
+        batch = self._pending.setdefault(video_id, {})
+        batch.setdefault(key, _Attempt(correct_answers, wrong_answers)).futures.append(future)
+        if len(batch) >= self.max_batch:
+            self._flush(video_id)
+        elif video_id not in self._timers:
+            self._timers[video_id] = loop.call_later(self.window, self._flush, video_id)
+        return await future
+
+    def _flush(self, video_id: str):
+        timer = self._timers.pop(video_id, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(video_id, None)
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(video_id, list(batch.values())))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, video_id: str, attempts: list):
+        def resolve(attempt, value=None, error=None):
+            for future in attempt.futures:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(value)
+
+        try:
+            if len(attempts) == 1:
+                attempt = attempts[0]
+                resolve(attempt, await generate_feedback(video_id, attempt.correct, attempt.wrong))
+                return
+
+            try:
+                await generate_feedback_batch(
+                    video_id,
+                    [(a.correct, a.wrong) for a in attempts],
+                    on_feedback=lambda i, feedback: resolve(attempts[i], feedback),
+                )
+            except UpstreamBusy:
+                # Retrying singly would only queue more calls; fail the batch
+                raise
+            except Exception as e:
+                logger.warning(f"[FEEDBACK] Batch request for {video_id} failed: {e}")
+            # Whatever the combined response missed goes through the single path
+            missing = [a for a in attempts if not all(f.done() for f in a.futures)]
+            if missing:
+                logger.warning(f"[FEEDBACK] {len(missing)} of {len(attempts)} attempts for {video_id} retried singly")
+                singles = await asyncio.gather(*(generate_feedback(video_id, a.correct, a.wrong) for a in missing))
+                for attempt, feedback in zip(missing, singles):
+                    resolve(attempt, feedback)
+        except Exception as e:
+            logger.error(f"[FEEDBACK] Batch for {video_id} failed: {e}")
+            for attempt in attempts:
+                resolve(attempt, error=e)
+
+
+# App-wide instance used by /feedback and /feedback/batch
+feedback_batcher = FeedbackBatcher()
@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import HTTPException
+
+from frenzy_render import FRENZY_IN_MEMORY, FRENZY_OUTPUT_DIR, prune_fragments
+from http_cache import strong_etag
+from render_pool import RenderQueueFull, render_pool
+from services import FRENZY_FRESH_SECONDS, generate_frenzy_pdf, generate_frenzy_pdf_bytes, run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt or layout changes so old guides stop being served
+FRENZY_CONTENT_VERSION = "2"
+# Retention for FRENZY_OUTPUT_DIR
+FRENZY_MAX_AGE_SECONDS = int(os.getenv("FRENZY_MAX_AGE_DAYS", "30")) * 86400
+FRENZY_MAX_BYTES = int(os.getenv("FRENZY_MAX_MB", "200")) * 1024 * 1024
+# Non-current files (superseded guides, temp renders, charts) live this long
+_GRACE_SECONDS = 3600
+# With FRENZY_IN_MEMORY (frenzy_render.py) guides are kept in process memory
+# instead of FRENZY_OUTPUT_DIR, up to this many bytes
+FRENZY_MEMORY_BYTES = int(os.getenv("FRENZY_MEMORY_MB", "64")) * 1024 * 1024
+
+_FILENAME = re.compile(r"^Fourteen_Day_Frenzy_(?P<lang>[A-Za-z0-9]+)_v(?P<version>\w+)_(?P<ts>\d+)\.pdf$")
+
+# Renders in flight in this process, keyed by language slug
+_inflight: dict[str, asyncio.Task] = {}
+# In-memory guides by language slug, least recently used first
+_memory: OrderedDict[str, "FrenzyGuide"] = OrderedDict()
+
+
+@dataclass
+class FrenzyGuide:
+    """
+    A rendered guide: on disk (`path`) or in memory (`data`), with a strong ETag.
+    """
+    filename: str
+    etag: str
+    created_at: float
+    path: str | None = None
+    data: bytes | None = None
+
+    async def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        return await run_blocking(_read_file, self.path)
+
+
+def normalize_language(language: str) -> str:
+    return " ".join(language.split()).title()
+
+
+def _slug(language: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "", language)
+
+
+def _latest(slug: str) -> tuple[str, float] | None:
+    """
+    Newest guide for `slug` at the current content version: (path, created_at).
+    """
+    best = None
+    if not os.path.isdir(FRENZY_OUTPUT_DIR):
+        return None
+    for name in os.listdir(FRENZY_OUTPUT_DIR):
+        m = _FILENAME.match(name)
+        if not m or m["lang"] != slug or m["version"] != FRENZY_CONTENT_VERSION:
+            continue
+        created_at = float(m["ts"])
+        if best is None or created_at > best[1]:
+            best = (os.path.join(FRENZY_OUTPUT_DIR, name), created_at)
+    return best
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=256)
+def _file_etag(path: str) -> str:
+    # Guide files are never rewritten in place (new render, new name)
+    return strong_etag(_read_file(path))
+
+
+async def _disk_guide(path: str, created_at: float) -> FrenzyGuide:
+    etag = await run_blocking(_file_etag, path)
+    return FrenzyGuide(filename=os.path.basename(path), etag=etag, created_at=created_at, path=path)
+
+
+async def _cached_guide(slug: str) -> FrenzyGuide | None:
+    if FRENZY_IN_MEMORY:
+        guide = _memory.get(slug)
+        if guide:
+            _memory.move_to_end(slug)
+        return guide
+    cached = await run_blocking(_latest, slug)
+    return await _disk_guide(*cached) if cached else None
+
+
+async def get_frenzy_guide(language: str) -> FrenzyGuide:
+    """
+    Return a rendered guide for `language`, reusing a cached one when
+    possible (stale copies trigger a background refresh).
+    """
+    language = normalize_language(language)
+    slug = _slug(language)
+    if not slug:
+        # Blank or punctuation only: nothing to name the guide (or prompt) with
+        raise HTTPException(status_code=400, detail="A language name is required.")
+
+    cached = await _cached_guide(slug)
+    if cached:
+        age = time.time() - cached.created_at
+        if age >= FRENZY_FRESH_SECONDS:
+            logger.info(f"[FRENZY] Serving stale {language} guide ({age / 3600:.1f}h old), refreshing")
+            try:
+                _render(language, slug)
+            except RenderQueueFull:
+                logger.info(f"[FRENZY] Render pool busy, deferring refresh of {language}")
+        else:
+            logger.info(f"[FRENZY] Cache hit for {language}")
+        return cached
+
+    logger.info(f"[FRENZY] Cache miss for {language}")
+    return await asyncio.shield(_render(language, slug))
+
+
+def _render(language: str, slug: str) -> asyncio.Task:
+    """
+    Start (or join) the render for `slug`. Starting a new one reserves a
+    render pool slot up front (RenderQueueFull when saturated) and holds it
+    while the content is generated, so renders still waiting on the LLM
+    count against the pool too. The slot is released when the task ends.
+    """
+    task = _inflight.get(slug)
+    if task is None:
+        render_pool.reserve()
+        render = _render_in_memory if FRENZY_IN_MEMORY else _render_and_publish
+        task = asyncio.create_task(render(language, slug))
+        _inflight[slug] = task
+        task.add_done_callback(lambda t: _finish_render(slug, t))
+    return task
+
+
+def _finish_render(slug: str, task: asyncio.Task):
+    render_pool.release()
+    _inflight.pop(slug, None)
+    if not task.cancelled() and task.exception():
+        logger.error(f"[FRENZY] Render for {slug} failed: {task.exception()}")
+
+
+def _filename(slug: str, created_at: float) -> str:
+    return f"Fourteen_Day_Frenzy_{slug}_v{FRENZY_CONTENT_VERSION}_{int(created_at)}.pdf"
+
+
+async def _render_in_memory(language: str, slug: str) -> FrenzyGuide:
+    created_at = time.time()
+    data = await generate_frenzy_pdf_bytes(language, reserved=True)
+    guide = FrenzyGuide(filename=_filename(slug, created_at), etag=strong_etag(data), created_at=created_at, data=data)
+    _memory[slug] = guide
+    _memory.move_to_end(slug)
+    total = sum(len(g.data) for g in _memory.values())
+    while total > FRENZY_MEMORY_BYTES and len(_memory) > 1:
+        _, evicted = _memory.popitem(last=False)
+        total -= len(evicted.data)
+    return guide
+
+
+async def _render_and_publish(language: str, slug: str) -> FrenzyGuide:
+    created_at = time.time()
+    filename = _filename(slug, created_at)
+    final_path = os.path.join(FRENZY_OUTPUT_DIR, filename)
+    # Render under a temp name so other workers never see a half-written file
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    try:
+        await generate_frenzy_pdf(language, tmp_path, reserved=True)
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    await run_blocking(apply_retention)
+    return await _disk_guide(final_path, int(created_at))
+
+
+def apply_retention() -> int:
+    """
+    Evict files from FRENZY_OUTPUT_DIR. Superseded guides, old-format files
+    and leftovers go once past a short grace period (they may still be
+    downloading or rendering); current guides go by age, then oldest-first
+    until the directory fits FRENZY_MAX_BYTES. Returns files removed.
+    Cached page fragments are trimmed to their own budget as well.
+    """
+    prune_fragments()
+    if not os.path.isdir(FRENZY_OUTPUT_DIR):
+        return 0
+    now = time.time()
+    newest = {}
+    files = []
+    for entry in os.scandir(FRENZY_OUTPUT_DIR):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+        m = _FILENAME.match(entry.name)
+        if m and m["version"] == FRENZY_CONTENT_VERSION:
+            if m["lang"] not in newest or int(m["ts"]) > newest[m["lang"]][0]:
+                newest[m["lang"]] = (int(m["ts"]), entry.path)
+    current = {path for _, path in newest.values()}
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in sorted(files):
+        age = now - mtime
+        if path in current:
+            evict = age > FRENZY_MAX_AGE_SECONDS or total > FRENZY_MAX_BYTES
+        else:
+            evict = age > _GRACE_SECONDS
+        if not evict:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"[FRENZY] Retention removed {removed} files ({total / (1024 * 1024):.1f} MB left)")
+    return removed
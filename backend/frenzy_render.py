@@ -0,0 +1,280 @@
+import io
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import importlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import store
+
+logger = logging.getLogger(__name__)
+
+# Rendered 14-Day Frenzy guides (see frenzy_cache.py for reuse/retention)
+FRENZY_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_pdfs")
+# Keep guides (frenzy_cache.py) and page fragments in process memory: nothing
+# is written to disk. Render workers inherit the setting from the environment.
+FRENZY_IN_MEMORY = os.getenv("FRENZY_IN_MEMORY", "0") == "1"
+
+# Rendered sections (title page, one per day, infographic page) as standalone
+# PDFs, shared by every render worker. A guide is assembled by concatenating
+# them, so a changed day only re-renders its own page. 0 disables the cache.
+# In memory mode each render worker keeps its own FRAGMENT_MAX_BYTES of them.
+FRAGMENT_DIR = os.path.join(store.DATA_DIR, "frenzy_fragments")
+FRAGMENT_MAX_BYTES = int(os.getenv("FRENZY_FRAGMENT_MAX_MB", "100")) * 1024 * 1024
+# Bump whenever the page layout or styles change
+FRAGMENT_VERSION = "1"
+
+# Fragments of this worker in memory mode, least recently used first
+_memory_fragments: OrderedDict[str, bytes] = OrderedDict()
+
+
+def warm_up():
+    """
+    Import ReportLab and matplotlib and build the styles up front (render
+    pool worker initializer).
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    importlib.import_module("matplotlib.pyplot")
+    importlib.import_module("reportlab.platypus")
+    _styles()
+
+
+@lru_cache(maxsize=1)
+def _styles() -> dict:
+    """
+    Sample stylesheet plus the Frenzy styles, built once per process.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'FrenzyTitle',
+            parent=styles['Title'],
+            fontSize=36,
+            spaceAfter=30,
+            textColor=colors.HexColor('#58cc02'),
+            alignment=1 # Center
+        ),
+        "heading": ParagraphStyle(
+            'FrenzyHeading',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1cb0f6'),
+            spaceAfter=12
+        ),
+        "body": ParagraphStyle(
+            'FrenzyBody',
+            parent=styles['Normal'],
+            fontSize=12,
+            leading=16,
+            spaceAfter=12
+        ),
+        "subtitle": styles['Heading2'],
+        "normal": styles['Normal'],
+        "italic": styles['Italic'],
+    }
+
+
+@lru_cache(maxsize=32)
+def _speaker_chart(language: str) -> bytes:
+    """
+    PNG of the speaker distribution pie chart; only the title varies by language.
+    """
+    import matplotlib
+    matplotlib.use('Agg') # Non-interactive backend
+    import matplotlib.pyplot as plt
+
+    # Mock data - in real app, could fetch real stats
+    labels = ['Native Speakers', 'L2 Speakers', 'Learners']
+    sizes = [40, 30, 30]
+    colors_list = ['#58cc02', '#1cb0f6', '#ff4b4b']
+
+    plt.figure(figsize=(6, 4))
+    plt.pie(sizes, labels=labels, colors=colors_list, autopct='%1.1f%%', startangle=140)
+    plt.title(f'Global {language} Speaker Distribution')
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png")
+    plt.close()
+    return buf.getvalue()
+
+
+def _build(story: list) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=letter).build(story)
+    return buf.getvalue()
+
+
+def _title_page(language: str) -> bytes:
+    from reportlab.platypus import Paragraph, Spacer
+    from reportlab.lib.units import inch
+
+    styles = _styles()
+    return _build([
+        Spacer(1, 2*inch),
+        Paragraph(f"Fourteen Day Frenzy: {language}", styles["title"]),
+        Spacer(1, 0.5*inch),
+        Paragraph("✈️ Your Ultimate 2-Week Beginner Guide", styles["subtitle"]),
+        Spacer(1, 2*inch),
+        Paragraph("Generated by LanGain AI", styles["normal"]),
+    ])
+
+
+def _day_page(day: dict) -> bytes:
+    from reportlab.platypus import Paragraph, Spacer
+    from reportlab.lib.units import inch
+
+    styles = _styles()
+    day_num = day.get('day', 0)
+    title_text = day.get('title', '')
+
+    # Avoid double "Day X: Day X:" if LLM returns it in title
+    if title_text.lower().startswith(f"day {day_num}"):
+        header_text = title_text
+    else:
+        header_text = f"Day {day_num}: {title_text}"
+
+    # Replace newlines w/ breaks, bold markers w/ tags
+    body_text = day.get('body', '')
+    # Simple markdown to HTML conversion for ReportLab Paragraphs
+    body_text = body_text.replace('\n', '<br/>')
+    body_text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', body_text)
+
+    return _build([
+        Paragraph(header_text, styles["heading"]),
+        Spacer(1, 0.2*inch),
+        Paragraph(body_text, styles["body"]),
+    ])
+
+
+def _infographic_page(language: str) -> bytes:
+    from reportlab.platypus import Paragraph, Spacer, Image as RLImage
+    from reportlab.lib.units import inch
+
+    styles = _styles()
+    return _build([
+        Paragraph(f"{language} by the Numbers", styles["heading"]),
+        Spacer(1, 0.5*inch),
+        RLImage(io.BytesIO(_speaker_chart(language)), width=6*inch, height=4*inch),
+        Paragraph("Data estimated for visualization purposes.", styles["italic"]),
+    ])
+
+
+def _fragment(language: str, day: int, content, render) -> bytes:
+    """
+    Cached section PDF keyed by (language, day, content_hash); `render()`
+    builds it on a miss.
+    """
+    if FRAGMENT_MAX_BYTES <= 0:
+        return render()
+    content_hash = hashlib.sha256(
+        json.dumps([FRAGMENT_VERSION, language, day, content], sort_keys=True).encode("utf-8")
+    ).hexdigest()[:32]
+    slug = re.sub(r"[^A-Za-z0-9]+", "", language) or "x"
+    name = f"{slug}_{day}_{content_hash}.pdf"
+    if FRENZY_IN_MEMORY:
+        return _memory_fragment(name, render)
+    path = os.path.join(FRAGMENT_DIR, name)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)
+        return data
+    except FileNotFoundError:
+        pass
+
+    data = render()
+    os.makedirs(FRAGMENT_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+def _memory_fragment(name: str, render) -> bytes:
+    data = _memory_fragments.get(name)
+    if data is not None:
+        _memory_fragments.move_to_end(name)
+        return data
+    data = render()
+    _memory_fragments[name] = data
+    total = sum(len(d) for d in _memory_fragments.values())
+    while total > FRAGMENT_MAX_BYTES and len(_memory_fragments) > 1:
+        _, evicted = _memory_fragments.popitem(last=False)
+        total -= len(evicted)
+    return data
+
+
+def render_frenzy_pdf(language: str, days_content: list, file_path: str | None = None) -> str:
+    """
+    Render the guide to `file_path` (default: a new file in FRENZY_OUTPUT_DIR).
+    """
+    # Ensure output directory exists (users mostly run from root or backend)
+    output_dir = FRENZY_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    if file_path is None:
+        filename = f"Fourteen_Day_Frenzy_{language}_{int(time.time())}.pdf"
+        file_path = os.path.join(output_dir, filename)
+
+    data = render_frenzy_pdf_bytes(language, days_content)
+    with open(file_path, "wb") as f:
+        f.write(data)
+    return file_path
+
+
+def render_frenzy_pdf_bytes(language: str, days_content: list) -> bytes:
+    """
+    Assemble the title page, day pages and infographic page from cached
+    fragments (rendering only the missing ones) into one in-memory PDF.
+    """
+    from pypdf import PdfWriter
+
+    sections = [_fragment(language, 0, None, lambda: _title_page(language))]
+    for day in days_content[:12]:
+        sections.append(_fragment(language, day.get('day', 0), day, lambda day=day: _day_page(day)))
+    sections.append(_fragment(language, 13, None, lambda: _infographic_page(language)))
+
+    writer = PdfWriter()
+    for section in sections:
+        writer.append(io.BytesIO(section))
+    buf = io.BytesIO()
+    writer.write(buf)
+    writer.close()
+    return buf.getvalue()
+
+
+def prune_fragments(max_bytes: int = FRAGMENT_MAX_BYTES) -> int:
+    """
+    Drop least-recently-used fragments beyond `max_bytes`. Returns files removed.
+    """
+    if not os.path.isdir(FRAGMENT_DIR):
+        return 0
+    files = []
+    for entry in os.scandir(FRAGMENT_DIR):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"[FRENZY] Pruned {removed} page fragments")
+    return removed
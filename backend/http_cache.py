@@ -0,0 +1,79 @@
+import re
+import hashlib
+
+from fastapi import Request, Response
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def strong_etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """
+    If-None-Match check (weak comparison, as RFC 9110 requires for it).
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    (start, end) inclusive for a single `bytes=` range; None to ignore the
+    header (malformed or multi-range: serve the whole body). Raises
+    ValueError when the range cannot be satisfied.
+    """
+    m = _RANGE.match(header.strip())
+    if not m or not (m[1] or m[2]):
+        return None
+    if m[1]:
+        start = int(m[1])
+        end = min(int(m[2]), size - 1) if m[2] else size - 1
+        if start >= size or end < start:
+            raise ValueError("unsatisfiable range")
+    else:
+        suffix = int(m[2])
+        if suffix == 0:
+            raise ValueError("unsatisfiable range")
+        start, end = max(0, size - suffix), size - 1
+    return start, end
+
+
+def conditional_response(
+    request: Request,
+    data: bytes,
+    etag: str,
+    media_type: str,
+    headers: dict | None = None,
+) -> Response:
+    """
+    Serve `data` with a strong ETag: 304 when If-None-Match matches, 206 for
+    a single satisfiable Range (honouring If-Range), 416 for an
+    unsatisfiable one, else 200.
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache",
+        **(headers or {}),
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, len(data))
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(data)}"})
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+    return Response(content=data, media_type=media_type, headers=headers)
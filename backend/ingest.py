@@ -0,0 +1,201 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import re
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+import metrics
+from services import run_blocking
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "sbhacks_uploads"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "500")) * 1024 * 1024
+# Spool files older than this are assumed orphaned (e.g. the worker crashed)
+SPOOL_MAX_AGE_SECONDS = int(os.getenv("SPOOL_MAX_AGE_SECONDS", "7200"))
+SPOOL_SWEEP_INTERVAL = 600
+SPOOL_PREFIX = "upload_"
+# Multipart boundaries/headers around the file part
+_ENVELOPE_SLACK = 64 * 1024
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _FilePart:
+    """
+    MultipartParser callbacks that collect the bytes of one named file field.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.filename = None
+        self.active = False
+        self.completed = False  # the file part's closing boundary was seen
+        self.ended = False      # the body's final boundary was seen
+        self.chunks = []
+        self._headers = {}
+        self._name = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._name.lower()] = self._value
+        self._name = b""
+        self._value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        if name == self.field and b"filename" in options and self.filename is None:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self.active = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.active:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self):
+        if self.active:
+            self.completed = True
+        self.active = False
+
+    def on_end(self):
+        self.ended = True
+
+
+async def spool_upload(request: Request, field: str = "file", max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Stream the `field` file of a multipart request into a unique spool file,
+    enforcing the size limit and computing the sha256 as chunks arrive.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+    try:
+        declared = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed Content-Length header.")
+    if declared > max_bytes + _ENVELOPE_SLACK:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit.")
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+    digest = hashlib.sha256()
+    size = 0
+    write_seconds = 0.0
+
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, dir=UPLOAD_SPOOL_DIR)
+    try:
+        with metrics.stage("spool"), os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except MultipartParseError as e:
+                    logger.warning(f"[INGEST] Malformed multipart body: {e}")
+                    raise HTTPException(status_code=400, detail="Malformed multipart body.")
+                if not part.chunks:
+                    continue
+                data = b"".join(part.chunks)
+                part.chunks.clear()
+                size += len(data)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB limit.")
+                digest.update(data)
+                write_start = time.perf_counter()
+                await run_blocking(out.write, data)
+                write_seconds += time.perf_counter() - write_start
+            parser.finalize()
+        metrics.record("spool_write", write_seconds)
+        if part.filename is None:
+            raise HTTPException(status_code=400, detail=f"Missing '{field}' file field.")
+        if not part.completed or not part.ended:
+            # The body stopped before the closing boundary (client disconnect, proxy cut-off)
+            raise HTTPException(status_code=400, detail="Upload was truncated.")
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    except BaseException:
+        os.remove(path)
+        raise
+
+    # Keep the extension; some indexers sniff the container from it
+    suffix = os.path.splitext(part.filename)[1]
+    if re.fullmatch(r"\.[A-Za-z0-9]{1,8}", suffix):
+        os.replace(path, path + suffix)
+        path += suffix
+
+    logger.info(f"[INGEST] Spooled {part.filename} ({size / (1024 * 1024):.1f} MB) to {path}")
+    return SpooledUpload(path=path, filename=part.filename, size=size, sha256=digest.hexdigest())
+
+
+def sweep_spool(max_age: int = SPOOL_MAX_AGE_SECONDS) -> int:
+    """
+    Delete spool files older than `max_age` seconds. Returns how many were removed.
+    """
+    if not os.path.isdir(UPLOAD_SPOOL_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(UPLOAD_SPOOL_DIR):
+        if not entry.name.startswith(SPOOL_PREFIX):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"[INGEST] Janitor removed {removed} orphaned spool files")
+    return removed
+
+
+async def run_janitor(interval: int = SPOOL_SWEEP_INTERVAL):
+    """
+    Sweep the spool directory now and then every `interval` seconds, so files
+    left behind by crashed workers are reclaimed.
+    """
+    while True:
+        try:
+            await run_blocking(sweep_spool)
+        except Exception as e:
+            logger.warning(f"[INGEST] Janitor sweep failed: {e}")
+        await asyncio.sleep(interval)
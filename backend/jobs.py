@@ -0,0 +1,240 @@
+import os
+import time
+import json
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+import quiz_store
+from services import generate_quiz_and_gist
+from store import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Max pipelines running at once; extra submissions wait in "queued"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Finished jobs are kept around this long so clients can still poll them
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+# Idle SSE streams send a comment this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+
+UPLOAD_STAGES = ("index", "gist", "quiz")
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    stages: dict
+    status: str = "queued"
+    result: dict = field(default_factory=dict)
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    events: list = field(default_factory=list)
+    subscribers: list = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobManager:
+    """
+    In-process job registry. Pipelines run as asyncio tasks bounded by a
+    semaphore, awaiting the async service layer directly.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, Job] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._janitor: asyncio.Task | None = None
+
+    def start(self):
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._janitor = asyncio.create_task(self._purge_loop())
+        logger.info(f"[JOBS] Started with {self.max_workers} workers")
+
+    async def stop(self):
+        if self._janitor:
+            self._janitor.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("[JOBS] Stopped")
+
+    def create(self, kind: str, stages=UPLOAD_STAGES) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            stages={name: {"status": "pending"} for name in stages},
+        )
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def run(self, job: Job, pipeline, cleanup=None):
+        """
+        Schedule `pipeline(job)` in the background. `cleanup` always runs afterwards.
+        """
+        task = asyncio.create_task(self._run(job, pipeline, cleanup))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job, pipeline, cleanup):
+        try:
+            async with self._slots:
+                self._set_status(job, "running")
+                await pipeline(job)
+                self._set_status(job, "succeeded")
+        except asyncio.CancelledError:
+            job.error = "Job cancelled"
+            self._set_status(job, "failed")
+            raise
+        except Exception as e:
+            logger.error(f"[JOBS] {job.kind} job {job.id} failed: {e}")
+            job.error = str(e)
+            self._set_status(job, "failed")
+        finally:
+            if cleanup:
+                try:
+                    cleanup()
+                except Exception as e:
+                    logger.warning(f"[JOBS] Cleanup for {job.id} failed: {e}")
+
+    # --- Stage bookkeeping (called from pipelines) ---
+
+    def start_stage(self, job: Job, stage: str):
+        job.stages[stage] = {"status": "running", "started_at": time.time()}
+        self._publish(job, "stage", {"stage": stage, **job.stages[stage]})
+
+    def finish_stage(self, job: Job, stage: str, **partial):
+        info = job.stages[stage]
+        info["status"] = "done"
+        info["finished_at"] = time.time()
+        info["duration"] = round(info["finished_at"] - info.get("started_at", info["finished_at"]), 3)
+        job.result.update(partial)
+        self._publish(job, "stage", {"stage": stage, **info, "result": partial})
+
+    def progress(self, job: Job, stage: str, **data):
+        """
+        Publish an intermediate result for a running stage (e.g. one quiz question).
+        """
+        self._publish(job, "progress", {"stage": stage, **data})
+
+    def fail_stage(self, job: Job, stage: str, error: Exception, **fallback):
+        info = job.stages[stage]
+        info["status"] = "failed"
+        info["finished_at"] = time.time()
+        info["error"] = str(error) or type(error).__name__
+        job.result.update(fallback)
+        self._publish(job, "stage", {"stage": stage, **info, "result": fallback})
+
+    # --- Event stream ---
+
+    async def stream(self, job: Job):
+        """
+        Yield Server-Sent Event frames: the job's history first, then live
+        updates until it finishes.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        try:
+            for event in list(job.events):
+                yield _sse(event)
+            if job.done:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event)
+                if event["event"] == "job" and event["data"]["status"] in ("succeeded", "failed"):
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+    def _set_status(self, job: Job, status: str):
+        job.status = status
+        self._publish(job, "job", {"status": status, "result": dict(job.result), "error": job.error})
+
+    def _publish(self, job: Job, name: str, data: dict):
+        job.updated_at = time.time()
+        event = {"event": name, "data": data}
+        job.events.append(event)
+        for queue in job.subscribers:
+            queue.put_nowait(event)
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.time() - self.ttl_seconds
+            expired = [j.id for j in self._jobs.values() if j.done and j.updated_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            if expired:
+                logger.info(f"[JOBS] Purged {len(expired)} finished jobs")
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def run_upload_pipeline(manager: JobManager, job: Job, index_fn, source: str, learner_id: str | None = None):
+    """
+    index, then gist and quiz concurrently, publishing each partial result as
+    soon as it is ready (quiz questions one by one as they stream in).
+    """
+    manager.start_stage(job, "index")
+    try:
+        video_id = await index_fn(source)
+    except Exception as e:
+        manager.fail_stage(job, "index", e)
+        raise
+    manager.finish_stage(job, "index", video_id=video_id)
+
+    manager.start_stage(job, "gist")
+    manager.start_stage(job, "quiz")
+
+    async def publish(name, value, error):
+        if name == "quiz":
+            # Clients answer by option index against the stored copy
+            partial = {"quiz": value, "quiz_id": await run_blocking(quiz_store.save, video_id, value)}
+        else:
+            partial = {key: value.get(key) for key in ("title", "topics", "hashtags")}
+        if error:
+            manager.fail_stage(job, name, error, **partial)
+        else:
+            manager.finish_stage(job, name, **partial)
+
+    def publish_question(index, question):
+        questions = job.result.setdefault("quiz", [])
+        if index == len(questions):
+            questions.append(question)
+        manager.progress(job, "quiz", index=index, question=question)
+
+    await generate_quiz_and_gist(video_id, on_result=publish, on_question=publish_question, learner_id=learner_id)
+
+
+jobs = JobManager()
@@ -0,0 +1,149 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+FENCE = "```"
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for LLM output that should contain one JSON array or
+    object. Text is fed in chunks as it streams; `feed` returns every array
+    element (or `(key, value)` object field) completed by that chunk, and
+    `finish` (at the end of the stream) whatever was held back.
+
+    JSON at the start of the output or inside a ``` code fence is taken as
+    soon as it closes. A bracket that follows prose outside a fence may just
+    be part of the prose ("Here are [5] questions:"), so it is only parsed
+    tentatively: its elements are held back, and JSON in a code fence later
+    on wins over it. Anything after the chosen JSON is ignored, and a
+    malformed element is skipped rather than failing the whole response.
+
+    With `expect` ("object", or "array" for an array of objects) a bracket
+    of the wrong shape is passed over and parsing resumes at the next one.
+    """
+
+    def __init__(self, expect: str | None = None):
+        self.expect = expect
+        self.container = None  # "array" | "object" once the opening bracket is seen
+        self.done = False
+        self.items = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element = []
+        self._skipping = False   # inside a container of the wrong shape
+        self._tentative = False  # inside a container that followed unfenced prose
+        self._preamble = []      # text outside containers, for spotting fences
+        self._candidate = None   # (container, items) of the first tentative container
+
+    def feed(self, text: str) -> list:
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            if self.container is None:
+                if ch in "[{":
+                    self._open("array" if ch == "[" else "object")
+                else:
+                    self._preamble.append(ch)
+                continue
+
+            if self._in_string:
+                self._element.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(completed)
+                    if self._skipping or (self.expect and not self.items):
+                        # Wrong shape, or nothing usable in it: look for the next one
+                        self._reset()
+                    elif self._tentative:
+                        # Keep it in case no fenced JSON follows
+                        if self._candidate is None:
+                            self._candidate = (self.container, self.items)
+                        self._preamble = []
+                        self._reset()
+                    else:
+                        self.done = True
+                        break
+                    continue
+            elif ch == "," and self._depth == 1:
+                self._complete(completed)
+                continue
+            self._element.append(ch)
+        return completed
+
+    def finish(self) -> list:
+        """
+        Call at the end of the stream: settles on the tentative JSON if nothing
+        better came, returning its elements (or fields).
+        """
+        if self.done or self._candidate is None:
+            return []
+        self.container, self.items = self._candidate
+        self._candidate = None
+        self.done = True
+        return list(self.items)
+
+    def result(self):
+        """
+        Everything parsed so far, as a list (array) or dict (object).
+        """
+        if self.container == "object":
+            return dict(self.items)
+        if self.container == "array":
+            return list(self.items)
+        return None
+
+    def _open(self, container: str):
+        self.container = container
+        self._depth = 1
+        self._skipping = self.expect is not None and container != self.expect
+        preamble = "".join(self._preamble)
+        fenced = preamble.count(FENCE) % 2 == 1
+        self._tentative = not fenced and (self._candidate is not None or bool(preamble.strip()))
+
+    def _reset(self):
+        self.container = None
+        self.items = []
+        self._element = []
+        self._skipping = False
+        self._tentative = False
+
+    def _complete(self, completed: list):
+        text = "".join(self._element).strip()
+        self._element = []
+        if not text or self._skipping:
+            return
+        try:
+            if self.container == "array":
+                item = json.loads(text)
+            else:
+                (item,) = json.loads("{" + text + "}").items()
+        except ValueError as e:
+            logger.warning(f"[JSON_STREAM] Skipping malformed element: {e}")
+            return
+        if self.expect == "array" and not isinstance(item, dict):
+            # An array of something else leads with it ("[5]"); later stray
+            # elements in an array of objects are just dropped
+            if not self.items:
+                self._skipping = True
+            return
+        self.items.append(item)
+        if not self._tentative:
+            completed.append(item)
+
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import logging
+
+import store
+from concepts import cluster_concepts
+
+logger = logging.getLogger(__name__)
+
+# Distinct concepts kept per list; the rarest are dropped beyond this
+LEARNER_MAX_CONCEPTS = int(os.getenv("LEARNER_MAX_CONCEPTS", "200"))
+# Concepts per list sent to the learning-plan prompt
+LEARNER_TOP_CONCEPTS = int(os.getenv("LEARNER_TOP_CONCEPTS", "15"))
+# Most recent feedback entries kept verbatim as "what changed lately"
+LEARNER_RECENT_DELTAS = int(os.getenv("LEARNER_RECENT_DELTAS", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS learner_profiles (
+    learner_id TEXT PRIMARY KEY,
+    quizzes INTEGER NOT NULL DEFAULT 0,
+    strengths TEXT NOT NULL DEFAULT '{}',
+    areas TEXT NOT NULL DEFAULT '{}',
+    summary TEXT,
+    summary_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS learner_deltas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    learner_id TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS learner_deltas_learner ON learner_deltas (learner_id, id);
+"""
+
+
+def _concept_key(text: str) -> str:
+    return " ".join(text.lower().split()).strip(" .!")
+
+
+def _add_concepts(counts: dict, concepts: list):
+    """
+    counts: {key: [display text, count]}; the first spelling seen is kept for display.
+    """
+    for text in concepts:
+        if not isinstance(text, str) or not text.strip():
+            continue
+        key = _concept_key(text)
+        if key in counts:
+            counts[key][1] += 1
+        else:
+            counts[key] = [text.strip(), 1]
+    if len(counts) > LEARNER_MAX_CONCEPTS:
+        keep = sorted(counts.items(), key=lambda kv: kv[1][1], reverse=True)[:LEARNER_MAX_CONCEPTS]
+        counts.clear()
+        counts.update(keep)
+
+
+def record_feedback(learner_id: str, feedbacks: list) -> int:
+    """
+    Fold one or more /feedback results into the learner's running counts and
+    recent deltas. Returns the learner's total quiz count.
+    """
+    conn = store.connect(SCHEMA)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT quizzes, strengths, areas FROM learner_profiles WHERE learner_id = ?", (learner_id,)
+        ).fetchone()
+        quizzes, strengths, areas = (row[0], json.loads(row[1]), json.loads(row[2])) if row else (0, {}, {})
+        for fb in feedbacks:
+            _add_concepts(strengths, fb.get("strengths", []))
+            _add_concepts(areas, fb.get("areas_to_improve", []))
+            conn.execute(
+                "INSERT INTO learner_deltas (learner_id, feedback, created_at) VALUES (?, ?, ?)",
+                (learner_id, json.dumps(fb), now),
+            )
+        quizzes += len(feedbacks)
+        conn.execute(
+            "INSERT INTO learner_profiles (learner_id, quizzes, strengths, areas, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(learner_id) DO UPDATE SET quizzes = excluded.quizzes, strengths = excluded.strengths, "
+            "areas = excluded.areas, updated_at = excluded.updated_at",
+            (learner_id, quizzes, json.dumps(strengths), json.dumps(areas), now),
+        )
+        conn.execute(
+            "DELETE FROM learner_deltas WHERE learner_id = ? AND id NOT IN "
+            "(SELECT id FROM learner_deltas WHERE learner_id = ? ORDER BY id DESC LIMIT ?)",
+            (learner_id, learner_id, LEARNER_RECENT_DELTAS),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return quizzes
+
+
+def rebuild(learner_id: str, feedbacks: list) -> int:
+    """
+    Replace the learner's profile with one built from `feedbacks` (oldest first).
+    """
+    conn = store.connect(SCHEMA)
+    conn.execute("DELETE FROM learner_profiles WHERE learner_id = ?", (learner_id,))
+    conn.execute("DELETE FROM learner_deltas WHERE learner_id = ?", (learner_id,))
+    logger.info(f"[PROFILE] Rebuilding {learner_id} from {len(feedbacks)} feedback entries")
+    return record_feedback(learner_id, feedbacks)
+
+
+def get_profile(learner_id: str) -> dict | None:
+    """
+    The compact view the learning plan is built from: quiz count, top concept
+    counts, the previous plan's summary and feedback recorded since then.
+    """
+    conn = store.connect(SCHEMA)
+    row = conn.execute(
+        "SELECT quizzes, strengths, areas, summary, summary_at FROM learner_profiles WHERE learner_id = ?",
+        (learner_id,),
+    ).fetchone()
+    if not row:
+        return None
+    quizzes, strengths, areas, summary, summary_at = row
+
+    def top(counts_json):
+        # Near-duplicate phrasings are merged before ranking
+        counts = {text: count for text, count in json.loads(counts_json).values()}
+        return [(c["label"], c["count"]) for c in cluster_concepts(counts)[:LEARNER_TOP_CONCEPTS]]
+
+    recent = [
+        json.loads(fb)
+        for (fb,) in conn.execute(
+            "SELECT feedback FROM learner_deltas WHERE learner_id = ? AND created_at > ? ORDER BY id",
+            (learner_id, summary_at or 0),
+        )
+    ]
+    return {
+        "learner_id": learner_id,
+        "quizzes": quizzes,
+        "strengths": top(strengths),
+        "areas_to_improve": top(areas),
+        "summary": json.loads(summary) if summary else None,
+        "recent": recent,
+    }
+
+
+def save_summary(learner_id: str, plan: dict):
+    """
+    Keep the gist of the latest plan so the next one only needs what changed since.
+    """
+    summary = {
+        "top_strengths": plan.get("top_strengths", []),
+        "top_areas_to_improve": plan.get("top_areas_to_improve", []),
+        "next_steps": plan.get("next_steps", ""),
+    }
+    store.connect(SCHEMA).execute(
+        "UPDATE learner_profiles SET summary = ?, summary_at = ? WHERE learner_id = ?",
+        (json.dumps(summary), time.time(), learner_id),
+    )
@@ -0,0 +1,144 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Starting guess for how long a call holds its slot, refined as calls complete
+_INITIAL_HOLD_SECONDS = 5.0
+
+
+class UpstreamBusy(RuntimeError):
+    """
+    Raised when a call would have to wait and the upstream's wait queue is
+    full. `retry_after` is an estimate (seconds) of when there is room again.
+    Not an upstream failure: callers let it propagate instead of falling
+    back, so the API can answer 429.
+    """
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(f"{upstream} is busy, retry in {retry_after}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class UpstreamLimiter:
+    """
+    Admission control for one upstream: at most `concurrency` calls in
+    flight, started at no more than `rate` per second (token bucket holding
+    `burst` tokens; 0 = no rate limit), and at most `queue_size` callers
+    waiting for either. Callers past that get UpstreamBusy straight away.
+    """
+
+    def __init__(self, name: str, concurrency: int, rate: float = 0.0, burst: int | None = None, queue_size: int = 32):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.rate = max(0.0, rate)
+        self.burst = max(1, burst if burst is not None else math.ceil(self.rate) or 1)
+        self.queue_size = max(0, queue_size)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._waiting = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._avg_hold = _INITIAL_HOLD_SECONDS
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _must_wait(self) -> bool:
+        if self._waiting or self._slots.locked():
+            return True
+        if self.rate:
+            self._refill()
+            return self._tokens < 1
+        return False
+
+    def retry_after(self) -> int:
+        """
+        Rough seconds until the callers already queued have been let through.
+        """
+        waves = self._waiting // self.concurrency + 1
+        seconds = self._avg_hold * waves
+        if self.rate:
+            seconds = max(seconds, (self._waiting + 1 - self._tokens) / self.rate)
+        return max(1, math.ceil(seconds))
+
+    async def _take_token(self):
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def acquire(self):
+        if self._must_wait() and self._waiting >= self.queue_size:
+            retry_after = self.retry_after()
+            metrics.UPSTREAM_REJECTED.inc(upstream=self.name)
+            logger.warning(f"[LIMITS] {self.name} queue full ({self._waiting} waiting), rejecting")
+            raise UpstreamBusy(self.name, retry_after)
+
+        start = time.perf_counter()
+        self._waiting += 1
+        metrics.UPSTREAM_QUEUE.inc(upstream=self.name)
+        try:
+            await self._slots.acquire()
+            try:
+                if self.rate:
+                    await self._take_token()
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self._waiting -= 1
+            metrics.UPSTREAM_QUEUE.dec(upstream=self.name)
+            waited = time.perf_counter() - start
+            metrics.UPSTREAM_WAIT_SECONDS.observe(waited, upstream=self.name)
+        if waited >= 0.001:
+            # Shows up in the request's Server-Timing header as its own stage
+            metrics.record(f"{self.name}_wait", waited)
+        metrics.UPSTREAM_IN_FLIGHT.inc(upstream=self.name)
+
+    def release(self, held: float):
+        metrics.UPSTREAM_IN_FLIGHT.dec(upstream=self.name)
+        self._slots.release()
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of this upstream's slots for the duration of the block.
+        """
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+
+def from_env(name: str, prefix: str, concurrency: int, queue_size: int, rate: float = 0.0) -> UpstreamLimiter:
+    """
+    Limiter configured by <prefix>_MAX_CONCURRENCY, <prefix>_RATE_LIMIT
+    (calls per second), <prefix>_BURST and <prefix>_QUEUE_SIZE, with the
+    given defaults.
+    """
+    burst = os.getenv(f"{prefix}_BURST")
+    return UpstreamLimiter(
+        name,
+        concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(concurrency))),
+        rate=float(os.getenv(f"{prefix}_RATE_LIMIT", str(rate))),
+        burst=int(burst) if burst else None,
+        queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", str(queue_size))),
+    )
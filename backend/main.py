@@ -1,14 +1,17 @@
-import os
 from pathlib import Path
-import shutil
+import json
+import asyncio
 import logging
 from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import partial
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 # Load env from backend/.env (relative to this file's location)
 env_path = Path(__file__).parent / ".env"
@@ -17,17 +20,55 @@ from services import (
     upload_video_file,
     upload_video_url,
     generate_quiz,
-    generate_gist,
-    generate_feedback,
+    generate_quiz_and_gist,
     generate_learning_plan,
-    generate_frenzy_pdf,
+    generate_learning_plan_for_profile,
+    perfect_score_feedback,
+    task_poller,
+    run_blocking,
 )
+from jobs import jobs, run_upload_pipeline
+from ingest import spool_upload, run_janitor
+import metrics
+import result_cache
+import learner_profile
+import quiz_store
+import catalog_storage
+from catalog import catalog_listing, catalog_warmer, quiz_and_gist as catalog_quiz_and_gist
+from feedback_batcher import feedback_batcher
+from frenzy_cache import get_frenzy_guide, apply_retention
+from http_cache import conditional_response, etag_matches, strong_etag
+from openrouter import openrouter
+from limits import UpstreamBusy
+from render_pool import RenderQueueFull, render_pool
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await openrouter.start()
+    render_pool.start()
+    jobs.start()
+    janitor = asyncio.create_task(run_janitor())
+    await run_blocking(apply_retention)
+    storage = catalog_storage.from_env()
+    catalog_listing.start(storage)
+    catalog_warmer.start(storage)
+    yield
+    janitor.cancel()
+    await catalog_warmer.stop()
+    if storage:
+        await storage.close()
+    await jobs.stop()
+    await task_poller.stop()
+    await openrouter.close()
+    render_pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS (open for simplicity; tighten in production)
 app.add_middleware(
@@ -36,7 +77,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Per-route latency metrics and a Server-Timing header on every response
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.exception_handler(UpstreamBusy)
+async def upstream_busy(request: Request, e: UpstreamBusy):
+    """
+    An upstream's wait queue is full: 429 with a Retry-After estimate. Routes
+    let UpstreamBusy propagate (past their catch-all 500s) to get here.
+    """
+    logger.warning(f"[API] {request.url.path} rejected: {e}")
+    return JSONResponse(status_code=429, content={"detail": str(e)}, headers={"Retry-After": str(e.retry_after)})
 
 
 @app.get("/")
@@ -45,85 +99,158 @@ def read_root():
 
 
 @app.post("/upload")
-async def upload_video(file: UploadFile = File(...)):
+async def upload_video(request: Request):
     """
-    Upload a video file, index it with TwelveLabs, then return quiz + gist.
+    Upload a video file (multipart field `file`), index it with TwelveLabs, then return quiz + gist.
     """
-    temp_file = f"temp_{file.filename}"
     start = datetime.now()
+    upload = None
 
     try:
-        # Save uploaded file to disk
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Basic validation to avoid broken uploads
-        size_mb = os.path.getsize(temp_file) / (1024 * 1024)
-        if size_mb <= 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        # Stream the body into a unique spool file (size limit + hash inline)
+        upload = await spool_upload(request)
 
         # Upload to TwelveLabs
-        video_id = upload_video_file(temp_file)
+        video_id = await upload_video_file(upload.path, content_hash=upload.sha256)
 
-        # Generate quiz
-        quiz = generate_quiz(video_id)
-
-        # Generate gist (title, topics, hashtags)
-        gist = generate_gist(video_id)
+        # Generate quiz and gist (title, topics, hashtags) concurrently
+        quiz, gist = await generate_quiz_and_gist(video_id)
+        quiz_id = await run_blocking(quiz_store.save, video_id, quiz)
 
         logger.info(f"[API] /upload completed in {(datetime.now() - start).total_seconds():.2f}s")
 
         return {
             "video_id": video_id,
             "quiz": quiz,
+            "quiz_id": quiz_id,
             "title": gist.get("title"),
             "topics": gist.get("topics"),
             "hashtags": gist.get("hashtags"),
         }
+    except (HTTPException, UpstreamBusy):
+        raise
     except Exception as e:
         logger.error(f"[API] /upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        if upload:
+            upload.remove()
 
 
 @app.post("/upload-url")
-async def upload_video_url_endpoint(url: str = Form(...)):
+async def upload_video_url_endpoint(url: str = Form(...), learner_id: Optional[str] = Form(None)):
     """
     Accept a public video URL (e.g., Supabase signed URL), send to TwelveLabs via video_url.
-    Returns quiz + gist.
+    Returns quiz + gist. With `learner_id` the quiz avoids questions that learner already saw.
     """
     start = datetime.now()
     try:
         if not url.strip():
             raise HTTPException(status_code=400, detail="URL is required.")
 
-        # Upload via video_url
-        video_id = upload_video_url(url.strip())
-
-        # Generate quiz
-        quiz = generate_quiz(video_id)
+        # Catalog videos indexed ahead of time by the warmer need no upstream calls
+        warmed = await catalog_quiz_and_gist(url.strip(), learner_id)
+        if warmed:
+            video_id, quiz, gist = warmed
+        else:
+            # Upload via video_url
+            video_id = await upload_video_url(url.strip())
 
-        # Gist
-        gist = generate_gist(video_id)
+            # Generate quiz and gist (title, topics, hashtags) concurrently
+            quiz, gist = await generate_quiz_and_gist(video_id, learner_id=learner_id)
+        quiz_id = await run_blocking(quiz_store.save, video_id, quiz)
 
         logger.info(f"[API] /upload-url completed in {(datetime.now() - start).total_seconds():.2f}s")
 
         return {
             "video_id": video_id,
             "quiz": quiz,
+            "quiz_id": quiz_id,
             "title": gist.get("title"),
             "topics": gist.get("topics"),
             "hashtags": gist.get("hashtags"),
         }
-    except HTTPException:
+    except (HTTPException, UpstreamBusy):
         raise
     except Exception as e:
         logger.error(f"[API] /upload-url failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/jobs/upload", status_code=202)
+async def submit_upload_job(request: Request):
+    """
+    Queue a video file (multipart field `file`) for indexing + quiz + gist.
+    Returns a job id right away.
+    """
+    upload = await spool_upload(request)
+    job = jobs.create("upload")
+
+    index_fn = partial(upload_video_file, content_hash=upload.sha256)
+    jobs.run(job, lambda j: run_upload_pipeline(jobs, j, index_fn, upload.path), upload.remove)
+    logger.info(f"[API] /jobs/upload queued job {job.id}")
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.post("/jobs/upload-url", status_code=202)
+async def submit_upload_url_job(url: str = Form(...), learner_id: Optional[str] = Form(None)):
+    """
+    Queue a video URL for indexing + quiz + gist. Returns a job id right away.
+    """
+    if not url.strip():
+        raise HTTPException(status_code=400, detail="URL is required.")
+
+    job = jobs.create("upload-url")
+    jobs.run(job, lambda j: run_upload_pipeline(jobs, j, upload_video_url, url.strip(), learner_id=learner_id))
+    logger.info(f"[API] /jobs/upload-url queued job {job.id}")
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/videos/{video_id}/quiz")
+async def get_video_quiz(video_id: str, learner_id: Optional[str] = None):
+    """
+    A fresh quiz for another attempt on an indexed video, sampled from its
+    question bank (questions the learner has not seen yet first).
+    """
+    start = datetime.now()
+    try:
+        quiz = await generate_quiz(video_id, learner_id=learner_id)
+        quiz_id = await run_blocking(quiz_store.save, video_id, quiz)
+        logger.info(f"[API] /videos/{video_id}/quiz completed in {(datetime.now() - start).total_seconds():.2f}s")
+        return {"video_id": video_id, "quiz": quiz, "quiz_id": quiz_id}
+    except UpstreamBusy:
+        raise
+    except Exception as e:
+        logger.error(f"[API] /videos/{video_id}/quiz failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Per-stage status and whatever partial results are ready so far.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.snapshot()
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events: one `stage` event per stage transition, then a final `job` event.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return StreamingResponse(
+        jobs.stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class QuizAnswer(BaseModel):
     question: str
     userAnswer: str
@@ -131,9 +258,15 @@ class QuizAnswer(BaseModel):
 
 
 class FeedbackRequest(BaseModel):
-    video_id: str
-    correct_answers: List[QuizAnswer]
-    wrong_answers: List[QuizAnswer]
+    # Either a stored quiz and the selected option index per question...
+    quiz_id: Optional[str] = None
+    answers: Optional[List[int]] = None
+    # ...or the full answer text (quizzes the server no longer has)
+    video_id: Optional[str] = None
+    correct_answers: List[QuizAnswer] = []
+    wrong_answers: List[QuizAnswer] = []
+    # When set, the result is folded into this learner's profile for /learning-plan
+    learner_id: Optional[str] = None
 
 
 @app.post("/feedback")
@@ -144,20 +277,96 @@ async def get_feedback(request: FeedbackRequest):
     """
     start = datetime.now()
     try:
-        # Convert to simple dicts for the prompt
-        correct = [{"question": a.question, "userAnswer": a.userAnswer} for a in request.correct_answers]
-        wrong = [{"question": a.question, "userAnswer": a.userAnswer, "correctAnswer": a.correctAnswer} for a in request.wrong_answers]
-        
-        feedback = generate_feedback(request.video_id, correct, wrong)
+        feedback = await _feedback_for(request)
         
         logger.info(f"[API] /feedback completed in {(datetime.now() - start).total_seconds():.2f}s")
         
         return feedback
+    except (HTTPException, UpstreamBusy):
+        raise
     except Exception as e:
         logger.error(f"[API] /feedback failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class FeedbackBatchRequest(BaseModel):
+    attempts: List[FeedbackRequest]
+
+
+@app.post("/feedback/batch")
+async def get_feedback_batch(request: FeedbackBatchRequest):
+    """
+    Feedback for many quiz attempts at once (e.g. a classroom session).
+    Attempts on the same video are graded together in one request; results
+    come back in the order the attempts were sent. An attempt that fails gets
+    {"error": {"status", "detail"}} in its place instead of failing the batch.
+    """
+    start = datetime.now()
+    outcomes = await asyncio.gather(*(_feedback_for(attempt) for attempt in request.attempts), return_exceptions=True)
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            outcome = {"error": _batch_error(outcome)}
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        results.append(outcome)
+    
+    failed = sum(1 for r in results if "error" in r)
+    logger.info(f"[API] /feedback/batch completed in {(datetime.now() - start).total_seconds():.2f}s ({len(results)} attempts, {failed} failed)")
+    
+    return {"results": results}
+
+
+def _batch_error(e: Exception) -> dict:
+    """
+    The status and detail /feedback would have answered with for `e`.
+    """
+    if isinstance(e, HTTPException):
+        return {"status": e.status_code, "detail": e.detail}
+    if isinstance(e, UpstreamBusy):
+        logger.warning(f"[API] /feedback/batch attempt rejected: {e}")
+        return {"status": 429, "detail": str(e), "retry_after": e.retry_after}
+    logger.error(f"[API] /feedback/batch attempt failed: {e}")
+    return {"status": 500, "detail": str(e)}
+
+
+async def _feedback_for(request: FeedbackRequest) -> dict:
+    if request.quiz_id:
+        video_id, correct, wrong = await _grade(request)
+    elif request.video_id:
+        video_id = request.video_id
+        # Convert to simple dicts for the prompt
+        correct = [{"question": a.question, "userAnswer": a.userAnswer} for a in request.correct_answers]
+        wrong = [{"question": a.question, "userAnswer": a.userAnswer, "correctAnswer": a.correctAnswer} for a in request.wrong_answers]
+    else:
+        raise HTTPException(status_code=400, detail="Either quiz_id and answers or video_id is required.")
+    
+    if correct and not wrong:
+        # Nothing to diagnose: no need to ask TwelveLabs
+        feedback = await perfect_score_feedback(video_id, correct)
+    else:
+        # Concurrent calls for the same video share one TwelveLabs request
+        feedback = await feedback_batcher.submit(video_id, correct, wrong)
+    if request.learner_id:
+        await run_blocking(learner_profile.record_feedback, request.learner_id, [feedback])
+    return feedback
+
+
+async def _grade(request: FeedbackRequest) -> tuple:
+    """
+    Grade selected option indexes against the stored quiz: (video_id, correct, wrong).
+    """
+    stored = await run_blocking(quiz_store.get, request.quiz_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired quiz_id; send the answers in full.")
+    video_id, questions = stored
+    try:
+        correct, wrong = quiz_store.grade(questions, request.answers or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return video_id, correct, wrong
+
+
 class FeedbackData(BaseModel):
     strengths: List[str]
     areas_to_improve: List[str]
@@ -166,7 +375,10 @@ class FeedbackData(BaseModel):
 
 
 class LearningPlanRequest(BaseModel):
-    feedback_history: List[FeedbackData]
+    # With learner_id the server-side profile is used and the history is only
+    # needed once, to seed a profile that does not exist yet
+    learner_id: Optional[str] = None
+    feedback_history: List[FeedbackData] = []
 
 
 @app.post("/learning-plan")
@@ -180,34 +392,148 @@ async def get_learning_plan(request: LearningPlanRequest):
         # Convert to list of dicts
         feedback_list = [fb.model_dump() for fb in request.feedback_history]
         
-        plan = generate_learning_plan(feedback_list)
+        profile = None
+        if request.learner_id:
+            profile = await run_blocking(learner_profile.get_profile, request.learner_id)
+            if feedback_list and (profile is None or profile["quizzes"] < len(feedback_list)):
+                # Seed from the client's history (sent newest first) when it
+                # knows about quizzes the profile missed
+                await run_blocking(learner_profile.rebuild, request.learner_id, feedback_list[::-1])
+                profile = await run_blocking(learner_profile.get_profile, request.learner_id)
+            elif profile is None and not feedback_list:
+                # The client thinks it seeded a profile this server does not
+                # have (data dir reset, another instance); it resends the history
+                logger.info(f"[API] /learning-plan: no profile for learner {request.learner_id}, asking for history")
+                raise HTTPException(status_code=409, detail="profile_missing")
+        
+        if profile:
+            plan = await generate_learning_plan_for_profile(profile)
+        else:
+            plan = await generate_learning_plan(feedback_list)
         
         logger.info(f"[API] /learning-plan completed in {(datetime.now() - start).total_seconds():.2f}s")
         
         return plan
+    except (HTTPException, UpstreamBusy):
+        raise
     except Exception as e:
         logger.error(f"[API] /learning-plan failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/learners/{learner_id}/profile")
+async def get_learner_profile(learner_id: str):
+    """
+    The rolling profile /learning-plan works from.
+    """
+    profile = await run_blocking(learner_profile.get_profile, learner_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile for this learner.")
+    return profile
+
+
+@app.get("/catalog")
+async def get_catalog(request: Request, offset: int = 0, limit: Optional[int] = None):
+    """
+    Catalog videos in one response: signed URL, display name and language
+    parsed from the file name, and gist metadata for pre-indexed videos.
+    Paginated with offset/limit; revalidate with If-None-Match.
+    """
+    if catalog_listing.storage is None:
+        raise HTTPException(status_code=404, detail="No catalog storage configured.")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1.")
+    start = datetime.now()
+    try:
+        page = await catalog_listing.page(offset, limit)
+        data = json.dumps(page, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # Signed URLs are per deployment, so only the browser may keep a copy
+        response = conditional_response(
+            request, data, strong_etag(data), media_type="application/json",
+            headers={"Cache-Control": "private, no-cache"},
+        )
+        logger.info(f"[API] /catalog completed in {(datetime.now() - start).total_seconds():.2f}s ({response.status_code})")
+        return response
+    except Exception as e:
+        logger.error(f"[API] /catalog failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/catalog/warm")
+async def warm_catalog():
+    """
+    Run a catalog warmer sweep now (new or changed catalog videos get indexed
+    with their question bank and gist) and report what it did.
+    """
+    if catalog_warmer.storage is None:
+        raise HTTPException(status_code=404, detail="No catalog storage configured.")
+    return await catalog_warmer.warm()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus text format: stage latency histograms, in-flight gauges, cache
+    lookups, fallbacks, upstream errors and retries (this worker only).
+    """
+    metrics.RENDER_QUEUE.set(render_pool.pending)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Result cache size and hit/miss counters (shared across workers; other
+    workers' counts are written every result_cache.STATS_FLUSH_EVERY lookups).
+    """
+    return await run_blocking(result_cache.stats)
+
+
+@app.delete("/cache")
+async def bust_cache(video_id: str | None = None, operation: str | None = None):
+    """
+    Drop cached quiz/gist/feedback results, optionally for one video and/or operation.
+    """
+    return {"deleted": await run_blocking(partial(result_cache.bust, video_id=video_id, operation=operation))}
+
+
 @app.post("/generate-frenzy")
-async def generate_frenzy(language: str = Form(...)):
+async def generate_frenzy(request: Request, language: str = Form(...)):
+    """
+    Download the 14-Day Frenzy PDF for the given language (cached per language).
+    """
+    return await _serve_frenzy(request, language, "/generate-frenzy")
+
+
+@app.get("/frenzy/{language}")
+async def get_frenzy(request: Request, language: str):
     """
-    Generate and download the 14-Day Frenzy PDF for the given language.
+    Cacheable GET for the 14-Day Frenzy PDF: strong ETag, If-None-Match (304)
+    and Range requests for resumed downloads.
     """
-    from fastapi.responses import FileResponse
+    return await _serve_frenzy(request, language, "/frenzy")
+
+
+async def _serve_frenzy(request: Request, language: str, endpoint: str):
     start = datetime.now()
     try:
-        pdf_path = generate_frenzy_pdf(language)
-        
-        logger.info(f"[API] /generate-frenzy completed in {(datetime.now() - start).total_seconds():.2f}s")
-        
-        filename = os.path.basename(pdf_path)
-        return FileResponse(
-            path=pdf_path, 
-            filename=filename, 
-            media_type='application/pdf'
+        guide = await get_frenzy_guide(language)
+        # Revalidations only need the ETag; skip reading the PDF for them
+        data = b"" if etag_matches(request.headers.get("if-none-match"), guide.etag) else await guide.read()
+        response = conditional_response(
+            request,
+            data,
+            guide.etag,
+            media_type='application/pdf',
+            headers={"Content-Disposition": f'attachment; filename="{guide.filename}"'},
         )
+        logger.info(f"[API] {endpoint} completed in {(datetime.now() - start).total_seconds():.2f}s ({response.status_code})")
+        return response
+    except (HTTPException, UpstreamBusy):
+        raise
+    except RenderQueueFull as e:
+        logger.warning(f"[API] {endpoint} rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
-        logger.error(f"[API] /generate-frenzy failed: {e}")
+        logger.error(f"[API] {endpoint} failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
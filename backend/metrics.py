@@ -0,0 +1,248 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# In-process metrics in the Prometheus text format. Each uvicorn worker keeps
+# its own numbers (scrape them per worker, or run one worker behind /metrics).
+
+PREFIX = "sbhacks"
+# Seconds; upstream calls range from milliseconds (cache) to minutes (indexing)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_registry: dict[str, "_Metric"] = {}
+
+# Stage timings of the request being served, for its Server-Timing header
+_timings: contextvars.ContextVar[list | None] = contextvars.ContextVar("stage_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = f"{PREFIX}_{name}"
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: tuple, value) -> list:
+        return [f"{self.name}{_labels(self.label_names, key)} {value:g}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key: tuple, value) -> list:
+        counts, total = value
+        names = self.label_names + ("le",)
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{self.name}_bucket{_labels(names, key + (le,))} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total:g}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labels: tuple = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: tuple = ()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    with _lock:
+        metrics = list(_registry.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+STAGE_SECONDS = histogram("stage_seconds", "Time spent per pipeline stage.", ("stage", "outcome"))
+STAGE_IN_FLIGHT = gauge("stage_in_flight", "Pipeline stages currently running.", ("stage",))
+UPSTREAM_ERRORS = counter("upstream_errors_total", "Failed calls to upstream APIs.", ("upstream", "stage"))
+UPSTREAM_RETRIES = counter("upstream_retries_total", "Upstream calls retried, by status code or error.", ("upstream", "reason"))
+FALLBACKS = counter("fallbacks_total", "Responses served from canned or local fallback content.", ("operation",))
+CACHE_LOOKUPS = counter("cache_lookups_total", "Result cache lookups.", ("operation", "result"))
+HTTP_SECONDS = histogram("http_request_seconds", "HTTP request latency.", ("method", "route", "status"))
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests being served.")
+RENDER_QUEUE = gauge("render_queue_depth", "PDF renders queued or running in the render pool.")
+UPSTREAM_QUEUE = gauge("upstream_queue_depth", "Calls waiting for an upstream concurrency slot or rate token.", ("upstream",))
+UPSTREAM_IN_FLIGHT = gauge("upstream_in_flight", "Upstream calls holding a concurrency slot.", ("upstream",))
+UPSTREAM_WAIT_SECONDS = histogram("upstream_wait_seconds", "Time spent queued before an upstream call.", ("upstream",))
+UPSTREAM_REJECTED = counter("upstream_rejected_total", "Calls turned away because the upstream's wait queue was full.", ("upstream",))
+
+
+@contextmanager
+def stage(name: str, upstream: str | None = None):
+    """
+    Time a pipeline stage: latency histogram, in-flight gauge, upstream error
+    counter (when `upstream` is given) and an entry in the current request's
+    Server-Timing header.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    STAGE_IN_FLIGHT.inc(stage=name)
+    try:
+        yield
+    except BaseException as e:
+        outcome = "error" if isinstance(e, Exception) else "cancelled"
+        if hasattr(e, "retry_after"):
+            # Turned away by admission control (UpstreamBusy, RenderQueueFull),
+            # not a failed upstream call
+            outcome = "rejected"
+        if upstream and outcome == "error":
+            UPSTREAM_ERRORS.inc(upstream=upstream, stage=name)
+        raise
+    finally:
+        STAGE_IN_FLIGHT.dec(stage=name)
+        record(name, time.perf_counter() - start, outcome)
+
+
+def record(name: str, seconds: float, outcome: str = "ok"):
+    """
+    Add time measured elsewhere (e.g. summed over many small calls) as a stage.
+    """
+    STAGE_SECONDS.observe(seconds, stage=name, outcome=outcome)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def fallback(operation: str):
+    FALLBACKS.inc(operation=operation)
+
+
+def start_request() -> contextvars.Token:
+    """
+    Begin collecting stage timings for the request handled in this context.
+    """
+    return _timings.set([])
+
+
+def server_timing(total: float) -> str:
+    """
+    Server-Timing header value for the current request: per-stage durations
+    (repeated stages summed, with a count) and the total, in milliseconds.
+    """
+    totals: dict[str, list] = {}
+    for name, elapsed in _timings.get() or []:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+    parts = [
+        f'{name};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (seconds, count) in totals.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def end_request(token: contextvars.Token):
+    _timings.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency and in-flight metrics per route, and a
+    Server-Timing header with the stages that ran before the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        token = start_request()
+        status = 500
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(time.perf_counter() - start).encode("latin-1")
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route, status=status)
+            end_request(token)
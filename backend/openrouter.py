@@ -0,0 +1,184 @@
+import os
+import json
+import random
+import importlib.util
+import asyncio
+import logging
+
+import httpx
+
+import limits
+import metrics
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+# Requests in flight at once; extra callers wait for a slot, up to
+# OPENROUTER_QUEUE_SIZE of them (then UpstreamBusy). OPENROUTER_RATE_LIMIT
+# and OPENROUTER_BURST add a token bucket (see limits.py).
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "16"))
+OPENROUTER_QUEUE_SIZE = int(os.getenv("OPENROUTER_QUEUE_SIZE", "64"))
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+OPENROUTER_HTTP2 = os.getenv("OPENROUTER_HTTP2", "1") == "1"
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OpenRouterClient:
+    """
+    Shared keep-alive client for the OpenRouter chat API: one connection pool
+    (HTTP/2 when available), admission control (limits.py), and retries with
+    backoff on 429/5xx and connection errors.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OPENROUTER_BASE_URL,
+        max_concurrency: int = OPENROUTER_MAX_CONCURRENCY,
+        max_retries: int = OPENROUTER_MAX_RETRIES,
+        http2: bool = OPENROUTER_HTTP2,
+    ):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.http2 = http2
+        self._http: httpx.AsyncClient | None = None
+        self._slots = limits.from_env("openrouter", "OPENROUTER", max_concurrency, OPENROUTER_QUEUE_SIZE)
+        # One pooled connection per slot
+        self.max_concurrency = self._slots.concurrency
+
+    async def start(self):
+        if self._http is not None:
+            return
+        http2 = self.http2 and importlib.util.find_spec("h2") is not None
+        if self.http2 and not http2:
+            logger.warning("[OPENROUTER] h2 not installed, falling back to HTTP/1.1")
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=60,
+            ),
+        )
+        logger.info(f"[OPENROUTER] Client started (http2={http2}, max_concurrency={self.max_concurrency})")
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def post_chat(self, payload: dict, timeout: float = 30.0) -> httpx.Response:
+        """
+        POST /chat/completions with retries; returns the final response (not raised).
+        """
+        await self.start()
+        headers = _headers()
+        attempt = 0
+        while True:
+            try:
+                async with self._slots.slot():
+                    response = await self._http.post("/chat/completions", headers=headers, json=payload, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = _retry_after(response) or _backoff(attempt)
+                logger.warning(f"[OPENROUTER] {response.status_code} from upstream, retrying in {delay:.1f}s")
+                metrics.UPSTREAM_RETRIES.inc(upstream="openrouter", reason=response.status_code)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = _backoff(attempt)
+                logger.warning(f"[OPENROUTER] {type(e).__name__}: {e}, retrying in {delay:.1f}s")
+                metrics.UPSTREAM_RETRIES.inc(upstream="openrouter", reason=type(e).__name__)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def chat(self, model: str, prompt: str, timeout: float = 30.0, **params) -> str:
+        """
+        Single-turn completion; returns the message content.
+        """
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **params}
+        response = await self.post_chat(payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def stream_chat(self, model: str, prompt: str, timeout: float = 30.0, **params):
+        """
+        Single-turn completion streamed as text deltas (async generator).
+        Retries only happen before the first delta has been yielded.
+        """
+        await self.start()
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": True, **params}
+        attempt = 0
+        started = False
+        while True:
+            try:
+                async with self._slots.slot():
+                    async with self._http.stream(
+                        "POST", "/chat/completions", headers=_headers(), json=payload, timeout=timeout
+                    ) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            # Read the (short) error body so the connection goes back to the pool
+                            await response.aread()
+                            delay = _retry_after(response) or _backoff(attempt)
+                            logger.warning(f"[OPENROUTER] {response.status_code} from upstream, retrying in {delay:.1f}s")
+                            metrics.UPSTREAM_RETRIES.inc(upstream="openrouter", reason=response.status_code)
+                        else:
+                            if response.is_error:
+                                await response.aread()
+                                response.raise_for_status()
+                            done = False
+                            async for line in response.aiter_lines():
+                                # Read on past [DONE] to the end of the body: closing a
+                                # half-read response drops its connection from the pool
+                                if done or not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    done = True
+                                    continue
+                                choices = json.loads(data).get("choices") or [{}]
+                                delta = (choices[0].get("delta") or {}).get("content")
+                                if delta:
+                                    started = True
+                                    yield delta
+                            return
+            except httpx.TransportError as e:
+                if started or attempt >= self.max_retries:
+                    raise
+                delay = _backoff(attempt)
+                logger.warning(f"[OPENROUTER] {type(e).__name__}: {e}, retrying in {delay:.1f}s")
+                metrics.UPSTREAM_RETRIES.inc(upstream="openrouter", reason=type(e).__name__)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {os.getenv('OPENROUTER_API_KEY')}",
+        "Content-Type": "application/json",
+    }
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("retry-after")
+    try:
+        return min(float(value), RETRY_MAX_DELAY) if value else None
+    except ValueError:
+        return None
+
+
+# App-wide instance; main.py starts and closes it with the FastAPI lifespan
+openrouter = OpenRouterClient()
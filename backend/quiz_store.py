@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+
+import store
+
+logger = logging.getLogger(__name__)
+
+# Quizzes not served again for this long are dropped (answers to them can no
+# longer be graded and need the full-text /feedback request instead)
+QUIZ_STORE_TTL = int(os.getenv("QUIZ_STORE_TTL_DAYS", "30")) * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    quiz_id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    served_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quizzes_served_at ON quizzes (served_at);
+CREATE TABLE IF NOT EXISTS seen_questions (
+    learner_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (learner_id, video_id, question_key)
+);
+"""
+
+
+def save(video_id: str, quiz: list) -> str:
+    """
+    Store a quiz as served to a client and return its id. Questions are kept
+    compactly as [question, options, correctAnswer]; the id is derived from
+    the content, so every worker serving the same quiz hands out the same id.
+    """
+    questions = [[q["question"], q["options"], q["correctAnswer"]] for q in quiz]
+    data = json.dumps(questions, ensure_ascii=False, separators=(",", ":"))
+    quiz_id = hashlib.sha256(f"{video_id}\n{data}".encode("utf-8")).hexdigest()[:20]
+    now = time.time()
+    conn = store.connect(SCHEMA)
+    conn.execute(
+        "INSERT INTO quizzes (quiz_id, video_id, questions, served_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(quiz_id) DO UPDATE SET served_at = excluded.served_at",
+        (quiz_id, video_id, data, now),
+    )
+    cur = conn.execute("DELETE FROM quizzes WHERE served_at < ?", (now - QUIZ_STORE_TTL,))
+    if cur.rowcount:
+        logger.info(f"[QUIZ] Dropped {cur.rowcount} expired quizzes")
+    return quiz_id
+
+
+def get(quiz_id: str) -> tuple | None:
+    """
+    (video_id, questions) for a stored quiz, or None if unknown or expired.
+    """
+    row = store.connect(SCHEMA).execute(
+        "SELECT video_id, questions FROM quizzes WHERE quiz_id = ?", (quiz_id,)
+    ).fetchone()
+    if not row:
+        return None
+    return row[0], json.loads(row[1])
+
+
+def grade(questions: list, answers: list) -> tuple:
+    """
+    Split selected option indexes into the (correct, wrong) answer lists
+    /feedback prompts are built from. Raises ValueError if `answers` does not
+    fit the quiz.
+    """
+    if len(answers) != len(questions):
+        raise ValueError(f"Expected {len(questions)} answers, got {len(answers)}")
+    correct, wrong = [], []
+    for (question, options, answer), selected in zip(questions, answers):
+        if not 0 <= selected < len(options):
+            raise ValueError(f"Answer {selected} out of range for: {question}")
+        if selected == answer:
+            correct.append({"question": question, "userAnswer": options[selected]})
+        else:
+            wrong.append({"question": question, "userAnswer": options[selected], "correctAnswer": options[answer]})
+    return correct, wrong
+
+
+def question_key(question: dict) -> str:
+    """
+    Identifies a bank question across regenerations (case/spacing-insensitive).
+    """
+    text = " ".join(question["question"].lower().split())
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def sample(video_id: str, bank: list, size: int, learner_id: str | None = None) -> list:
+    """
+    Pick `size` questions from a video's bank. For a known learner, questions
+    they have not been shown yet come first, then the ones seen longest ago;
+    the picks are recorded as seen.
+    """
+    if not learner_id:
+        return random.sample(bank, min(size, len(bank)))
+    seen = dict(store.connect(SCHEMA).execute(
+        "SELECT question_key, seen_at FROM seen_questions WHERE learner_id = ? AND video_id = ?",
+        (learner_id, video_id),
+    ).fetchall())
+    # Random order among equally fresh questions, oldest sightings after unseen ones
+    order = random.sample(bank, len(bank))
+    order.sort(key=lambda q: seen.get(question_key(q), 0))
+    quiz = order[:size]
+    mark_seen(learner_id, video_id, quiz)
+    return quiz
+
+
+def mark_seen(learner_id: str, video_id: str, questions: list):
+    now = time.time()
+    store.connect(SCHEMA).executemany(
+        "INSERT OR REPLACE INTO seen_questions (learner_id, video_id, question_key, seen_at) VALUES (?, ?, ?, ?)",
+        [(learner_id, video_id, question_key(q), now) for q in questions],
+    )
@@ -0,0 +1,148 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import frenzy_render
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for PDF rendering (ReportLab + matplotlib are CPU-bound and
+# pyplot state is process-global, so each render gets its own process)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+# Renders allowed to wait for a worker; beyond that callers are turned away
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "8"))
+# Starting guess for a render's duration, refined as renders complete
+_INITIAL_RENDER_SECONDS = 5.0
+
+
+class RenderQueueFull(RuntimeError):
+    """
+    Raised when every worker is busy and the wait queue is full (or the
+    pool broke twice in a row). `retry_after` is an estimate (seconds) of when a slot frees up.
+    """
+
+    def __init__(self, retry_after: int, reason: str = "Render queue is full"):
+        super().__init__(f"{reason}, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderPool:
+    """
+    Process pool for PDF rendering with a bounded queue. Workers import
+    ReportLab and matplotlib once at startup; submissions past
+    `max_workers + queue_size` raise RenderQueueFull instead of piling up.
+    """
+
+    def __init__(self, max_workers: int = RENDER_WORKERS, queue_size: int = RENDER_QUEUE_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._avg_seconds = _INITIAL_RENDER_SECONDS
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_size
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def full(self) -> bool:
+        return self._pending >= self.capacity
+
+    def start(self):
+        if self._executor is not None:
+            return
+        # spawn: never fork the server process with its event loop and threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=frenzy_render.warm_up,
+        )
+        logger.info(f"[RENDER] Pool started (workers={self.max_workers}, queue={self.queue_size})")
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """
+        Replace `broken` (a worker died, e.g. OOM-killed) with a fresh
+        executor, unless a concurrent caller already has.
+        """
+        if self._executor is broken:
+            logger.warning("[RENDER] Worker process died, restarting the pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.start()
+
+    def retry_after(self) -> int:
+        """
+        Rough seconds until a queue slot frees up.
+        """
+        waves = (self._pending - self.capacity) // self.max_workers + 1
+        return max(1, math.ceil(self._avg_seconds * max(1, waves)))
+
+    def check_capacity(self):
+        if self.full:
+            raise RenderQueueFull(self.retry_after())
+
+    def reserve(self):
+        """
+        Claim a slot for a render whose input is still being prepared (and
+        later `submit(..., reserved=True)` it); raises RenderQueueFull when
+        saturated. Every reserve() needs a matching release().
+        """
+        self.check_capacity()
+        self._pending += 1
+
+    def release(self):
+        self._pending -= 1
+
+    async def submit(self, fn, *args, reserved: bool = False):
+        """
+        Run `fn(*args)` on a worker process; raises RenderQueueFull when
+        saturated (unless the caller already holds a reserved slot). If the
+        pool breaks (a worker died), it is restarted and the render retried
+        once; a second break raises RenderQueueFull as well.
+        """
+        if not reserved:
+            self.reserve()
+        self.start()
+        try:
+            loop = asyncio.get_running_loop()
+            for attempt in range(2):
+                executor = self._executor
+                try:
+                    elapsed, result = await loop.run_in_executor(executor, _timed, fn, *args)
+                    break
+                except BrokenProcessPool:
+                    self._restart(executor)
+                    if attempt:
+                        raise RenderQueueFull(self.retry_after(), "Render workers keep crashing")
+        finally:
+            if not reserved:
+                self.release()
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+        return result
+
+
+def _timed(fn, *args):
+    """
+    Runs in the worker: (render seconds excluding queue wait, result).
+    """
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+# App-wide instance; main.py starts and stops it with the FastAPI lifespan
+render_pool = RenderPool()
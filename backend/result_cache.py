@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from functools import partial
+
+import metrics
+import store
+from store import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Total size of cached JSON values before least-recently-used rows are evicted
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_cache (
+    video_id TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (video_id, operation, prompt_hash, model)
+);
+CREATE INDEX IF NOT EXISTS result_cache_last_access ON result_cache (last_access);
+CREATE TABLE IF NOT EXISTS result_cache_stats (
+    operation TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Computations in flight in this process, so concurrent misses share one call
+_inflight: dict[tuple, asyncio.Task] = {}
+
+# A hit only rewrites last_access when it is older than this, so most hits
+# are a single read (LRU order is kept to the minute)
+LAST_ACCESS_RESOLUTION = 60
+# Hit/miss counts are kept in memory and written every this many lookups
+STATS_FLUSH_EVERY = 100
+_counters_lock = threading.Lock()
+_pending_stats: dict[str, list] = {}   # operation -> [hits, misses]
+_pending_lookups = 0
+# Eviction scans the whole table, so it runs once this many bytes were written
+EVICT_EVERY_BYTES = max(1, RESULT_CACHE_MAX_BYTES // 20)
+_written_since_evict = EVICT_EVERY_BYTES
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+
+def get(video_id: str, operation: str, prompt: str, model: str, max_age: float | None = None):
+    """
+    Return the cached value or None, counting the hit/miss. Entries created
+    more than `max_age` seconds ago count as misses. Blocking; call it
+    through run_blocking from async code.
+    """
+    conn = store.connect(SCHEMA)
+    key = (video_id, operation, prompt_hash(prompt), model)
+    row = conn.execute(
+        "SELECT value, created_at, last_access FROM result_cache "
+        "WHERE video_id = ? AND operation = ? AND prompt_hash = ? AND model = ?",
+        key,
+    ).fetchone()
+    now = time.time()
+    if row and max_age is not None and now - row[1] > max_age:
+        row = None
+    metrics.CACHE_LOOKUPS.inc(operation=operation, result="hit" if row else "miss")
+    _count(conn, operation, hit=row is not None)
+    if not row:
+        return None
+    if now - row[2] >= LAST_ACCESS_RESOLUTION:
+        conn.execute(
+            "UPDATE result_cache SET last_access = ? WHERE video_id = ? AND operation = ? AND prompt_hash = ? AND model = ?",
+            (now, *key),
+        )
+    return json.loads(row[0])
+
+
+def _count(conn, operation: str, hit: bool):
+    global _pending_lookups
+    with _counters_lock:
+        _pending_stats.setdefault(operation, [0, 0])[0 if hit else 1] += 1
+        _pending_lookups += 1
+        if _pending_lookups < STATS_FLUSH_EVERY:
+            return
+    _flush_stats(conn)
+
+
+def _flush_stats(conn):
+    global _pending_lookups
+    with _counters_lock:
+        pending = list(_pending_stats.items())
+        _pending_stats.clear()
+        _pending_lookups = 0
+    for operation, (hits, misses) in pending:
+        conn.execute(
+            "INSERT INTO result_cache_stats (operation, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT(operation) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (operation, hits, misses),
+        )
+
+
+def put(video_id: str, operation: str, prompt: str, model: str, value):
+    """
+    Cache `value`. Blocking; call it through run_blocking from async code.
+    """
+    global _written_since_evict
+    conn = store.connect(SCHEMA)
+    data = json.dumps(value)
+    now = time.time()
+    conn.execute(
+        "INSERT OR REPLACE INTO result_cache "
+        "(video_id, operation, prompt_hash, model, value, size, created_at, last_access) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (video_id, operation, prompt_hash(prompt), model, data, len(data), now, now),
+    )
+    with _counters_lock:
+        _written_since_evict += len(data)
+        due = _written_since_evict >= EVICT_EVERY_BYTES
+        if due:
+            _written_since_evict = 0
+    if due:
+        _evict(conn)
+
+
+def _evict(conn):
+    """
+    Drop least-recently-used rows beyond RESULT_CACHE_MAX_BYTES.
+    """
+    cur = conn.execute(
+        "DELETE FROM result_cache WHERE rowid IN ("
+        "  SELECT rowid FROM ("
+        "    SELECT rowid, SUM(size) OVER (ORDER BY last_access DESC, rowid DESC) AS running FROM result_cache"
+        "  ) WHERE running > ?"
+        ")",
+        (RESULT_CACHE_MAX_BYTES,),
+    )
+    if cur.rowcount:
+        logger.info(f"[CACHE] Evicted {cur.rowcount} entries")
+
+
+async def get_or_compute(video_id: str, operation: str, prompt: str, model: str, compute, max_age: float | None = None):
+    """
+    Return the cached value, or await `compute()` and cache its result.
+    `compute` returning None (e.g. unparseable output) is not cached; with
+    `max_age`, older entries are recomputed (and replaced).
+    Concurrent misses share one computation, which runs in its own task:
+    a caller that is cancelled or times out does not take it down for the
+    others.
+    """
+    key = (video_id, operation, prompt_hash(prompt), model)
+    if key not in _inflight:
+        value = await run_blocking(get, video_id, operation, prompt, model, max_age)
+        if value is not None:
+            logger.info(f"[CACHE] Hit {operation} for {video_id}")
+            return value
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_compute_and_put(video_id, operation, prompt, model, compute))
+        _inflight[key] = task
+        task.add_done_callback(partial(_compute_done, key))
+    return await asyncio.shield(task)
+
+
+async def _compute_and_put(video_id: str, operation: str, prompt: str, model: str, compute):
+    value = await compute()
+    if value is not None:
+        await run_blocking(put, video_id, operation, prompt, model, value)
+    return value
+
+
+def _compute_done(key: tuple, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Retrieve it so a computation every caller gave up on doesn't log
+    # "exception never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+def bust(video_id: str | None = None, operation: str | None = None) -> int:
+    """
+    Delete cached entries, optionally limited to one video and/or operation.
+    """
+    clauses, params = [], []
+    if video_id:
+        clauses.append("video_id = ?")
+        params.append(video_id)
+    if operation:
+        clauses.append("operation = ?")
+        params.append(operation)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    cur = store.connect(SCHEMA).execute(f"DELETE FROM result_cache{where}", params)
+    logger.info(f"[CACHE] Busted {cur.rowcount} entries (video_id={video_id}, operation={operation})")
+    return cur.rowcount
+
+
+def stats() -> dict:
+    conn = store.connect(SCHEMA)
+    _flush_stats(conn)
+    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM result_cache").fetchone()
+    operations = {
+        op: {"hits": hits, "misses": misses}
+        for op, hits, misses in conn.execute("SELECT operation, hits, misses FROM result_cache_stats")
+    }
+    return {
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": RESULT_CACHE_MAX_BYTES,
+        "hits": sum(o["hits"] for o in operations.values()),
+        "misses": sum(o["misses"] for o in operations.values()),
+        "operations": operations,
+    }
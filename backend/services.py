@@ -1,12 +1,31 @@
 import os
 import time
+import asyncio
 import logging
 import json
-import re
-import httpx
-from twelvelabs import TwelveLabs
+import fcntl
+from collections import Counter
+from functools import partial
+
+from twelvelabs import AsyncTwelveLabs
+from twelvelabs.core.api_error import ApiError
 from twelvelabs.indexes import IndexesCreateRequestModelsItem
 
+import dedup
+from concepts import top_concepts
+import learner_profile
+import limits
+import metrics
+import quiz_store
+from frenzy_render import render_frenzy_pdf, render_frenzy_pdf_bytes
+from json_stream import JSONStreamParser
+from openrouter import openrouter
+from render_pool import render_pool
+import result_cache
+import store
+from store import run_blocking
+from task_poller import TaskPoller
+
 # Basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,19 +34,136 @@ logger = logging.getLogger(__name__)
 api_key = os.getenv("TL_API_KEY")
 if not api_key:
     raise RuntimeError("TL_API_KEY not set")
-client = TwelveLabs(api_key=api_key)
+client = AsyncTwelveLabs(api_key=api_key)
 
 INDEX_NAME = "sbhacks_generate_v1"
+# Generative model on INDEX_NAME; part of every result cache key
+GENERATE_MODEL = "pegasus1.2"
+
+# Resolved index id, cached per process and (optionally) on disk
+INDEX_CACHE_TTL = int(os.getenv("INDEX_CACHE_TTL", "3600"))
+PERSIST_INDEX_ID = os.getenv("PERSIST_INDEX_ID", "1") == "1"
+INDEX_ID_FILE = os.path.join(store.DATA_DIR, "index_id.json")
+_index_id: str | None = None
+_index_resolved_at = 0.0
+_index_lock = asyncio.Lock()
+
+# Admission control per TwelveLabs endpoint family (limits.py): analysis and
+# gist calls share TL_GENERATE_*, indexing task creation has TL_INDEX_*
+tl_generate = limits.from_env("twelvelabs_generate", "TL_GENERATE", concurrency=8, queue_size=32)
+tl_index = limits.from_env("twelvelabs_index", "TL_INDEX", concurrency=4, queue_size=16)
+
+# One poller watches every pending indexing task for this process
+task_poller = TaskPoller(lambda task_id: client.tasks.retrieve(task_id))
+
+# Per-call timeout for the quiz/gist fan-out after indexing
+QUIZ_GIST_TIMEOUT = float(os.getenv("QUIZ_GIST_TIMEOUT", "120"))
+
+
+async def get_or_create_index(stale_id: str | None = None) -> str:
+    """
+    Return the id of our generate-capable index, creating it if needed.
+    The id is cached in-process and on disk for INDEX_CACHE_TTL seconds, and
+    concurrent callers (across workers too) share a single lookup/create.
+    Pass `stale_id` to force a refresh after TwelveLabs rejected that id.
+    """
+    global _index_id, _index_resolved_at
+
+    def usable(index_id, resolved_at):
+        return index_id and index_id != stale_id and time.time() - resolved_at < INDEX_CACHE_TTL
+
+    if usable(_index_id, _index_resolved_at):
+        return _index_id
 
+    async with _index_lock:
+        if usable(_index_id, _index_resolved_at):
+            return _index_id
 
-def get_or_create_index() -> str:
+        lock_fd = await run_blocking(_acquire_index_file_lock)
+        try:
+            # Another worker may have resolved it while we waited
+            persisted = await run_blocking(_read_persisted_index)
+            if persisted and usable(persisted.get("index_id"), persisted.get("resolved_at", 0)):
+                _index_id, _index_resolved_at = persisted["index_id"], persisted["resolved_at"]
+                logger.info(f"[INDEX] Using persisted index id: {_index_id}")
+                return _index_id
+
+            if stale_id:
+                logger.warning(f"[INDEX] Index {stale_id} rejected by TwelveLabs; resolving again")
+            with metrics.stage("index_resolve", upstream="twelvelabs"):
+                _index_id = await _find_or_create_index()
+            _index_resolved_at = time.time()
+            await run_blocking(_write_persisted_index, _index_id, _index_resolved_at)
+            return _index_id
+        finally:
+            await run_blocking(_release_index_file_lock, lock_fd)
+
+
+def _acquire_index_file_lock() -> int:
+    os.makedirs(store.DATA_DIR, exist_ok=True)
+    fd = os.open(os.path.join(store.DATA_DIR, "index.lock"), os.O_CREAT | os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+
+def _release_index_file_lock(fd: int):
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+def _read_persisted_index() -> dict | None:
+    if not PERSIST_INDEX_ID or not os.path.exists(INDEX_ID_FILE):
+        return None
+    try:
+        with open(INDEX_ID_FILE) as f:
+            data = json.load(f)
+        return data if data.get("index_name") == INDEX_NAME else None
+    except (OSError, ValueError) as e:
+        logger.warning(f"[INDEX] Ignoring unreadable {INDEX_ID_FILE}: {e}")
+        return None
+
+
+def _write_persisted_index(index_id: str, resolved_at: float):
+    if not PERSIST_INDEX_ID:
+        return
+    tmp_path = f"{INDEX_ID_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"index_name": INDEX_NAME, "index_id": index_id, "resolved_at": resolved_at}, f)
+    os.replace(tmp_path, INDEX_ID_FILE)
+
+
+def _is_unknown_index_error(e: Exception) -> bool:
+    if not isinstance(e, ApiError):
+        return False
+    return e.status_code == 404 or "index_not_exists" in str(e.body)
+
+
+async def _create_task(index_id: str, **source):
+    """
+    tasks.create, re-resolving the index once if TwelveLabs no longer knows it.
+    Returns (index_id, task).
+    """
+    try:
+        async with tl_index.slot():
+            with metrics.stage("tasks_create", upstream="twelvelabs"):
+                return index_id, await client.tasks.create(index_id=index_id, **source)
+    except ApiError as e:
+        if not _is_unknown_index_error(e):
+            raise
+        index_id = await get_or_create_index(stale_id=index_id)
+        async with tl_index.slot():
+            with metrics.stage("tasks_create", upstream="twelvelabs"):
+                return index_id, await client.tasks.create(index_id=index_id, **source)
+
+
+async def _find_or_create_index() -> str:
     """
     Return an existing generate-capable index or create one.
     """
     # 1) Look for our specific index by name
     try:
-        indexes = list(client.indexes.list(page_limit=50))
-        for idx in indexes:
+        indexes = await client.indexes.list(page_limit=50)
+        async for idx in indexes:
             if idx.index_name == INDEX_NAME:
                 logger.info(f"[INDEX] Found existing index: {idx.id} ({INDEX_NAME})")
                 return idx.id
@@ -37,35 +173,38 @@ def get_or_create_index() -> str:
     # 2) Create a new generate-capable index (pegasus1.2)
     logger.info(f"[INDEX] Creating new index {INDEX_NAME} with pegasus1.2")
     try:
-        target_index = client.indexes.create(
+        target_index = await client.indexes.create(
             index_name=INDEX_NAME,
             models=[
                 IndexesCreateRequestModelsItem(
-                    model_name="pegasus1.2",
+                    model_name=GENERATE_MODEL,
                     model_options=["visual", "audio"],
                 )
             ],
         )
         logger.info(f"[INDEX] Created index: {target_index.id}")
+        await run_blocking(dedup.invalidate_except, target_index.id)
         return target_index.id
     except TypeError as e:
         logger.warning(f"[INDEX] Retrying with 'name' param: {e}")
-        target_index = client.indexes.create(
+        target_index = await client.indexes.create(
             name=INDEX_NAME,
             models=[
                 IndexesCreateRequestModelsItem(
-                    model_name="pegasus1.2",
+                    model_name=GENERATE_MODEL,
                     model_options=["visual", "audio"],
                 )
             ],
         )
         logger.info(f"[INDEX] Created index (fallback): {target_index.id}")
+        await run_blocking(dedup.invalidate_except, target_index.id)
         return target_index.id
 
 
-def upload_video_file(file_path: str) -> str:
+async def upload_video_file(file_path: str, content_hash: str | None = None) -> str:
     """
     Upload a local file to TwelveLabs and return the video_id.
+    If `content_hash` (sha256 hex) was indexed before, reuse that video_id.
     """
     if not os.path.exists(file_path):
         raise RuntimeError(f"File path does not exist: {file_path}")
@@ -74,90 +213,211 @@ def upload_video_file(file_path: str) -> str:
     if file_size_mb <= 0:
         raise RuntimeError("File is empty; cannot upload to TwelveLabs.")
 
-    index_id = get_or_create_index()
+    index_id = await get_or_create_index()
+    key = dedup.content_key(content_hash) if content_hash else None
+    if key:
+        video_id = await run_blocking(dedup.lookup, key, index_id)
+        if video_id:
+            logger.info(f"[UPLOAD] Reusing video {video_id} for {key}")
+            return video_id
+
     # SDK expects video_file (not file)
-    task = client.tasks.create(index_id=index_id, video_file=file_path)
+    index_id, task = await _create_task(index_id, video_file=file_path)
     logger.info(f"[UPLOAD] Task created: {task.id}")
 
-    # Poll until ready/failed
-    while True:
-        task_status = client.tasks.retrieve(task.id)
-        logger.info(f"[UPLOAD] Status: {task_status.status}")
-        if task_status.status == "ready":
-            return task_status.video_id
-        if task_status.status == "failed":
-            raise RuntimeError("Video processing failed")
-        time.sleep(2)
+    # Wait on the shared poller until ready/failed
+    with metrics.stage("index_wait", upstream="twelvelabs"):
+        video_id = await task_poller.wait(task.id, label="UPLOAD")
+    if key:
+        await run_blocking(dedup.remember, key, index_id, video_id)
+    return video_id
 
 
-def upload_video_url(video_url: str) -> str:
+async def upload_video_url(video_url: str) -> str:
     """
     Upload a remote video URL to TwelveLabs and return the video_id.
     """
     if not video_url:
         raise RuntimeError("video_url is required")
 
-    index_id = get_or_create_index()
-    task = client.tasks.create(index_id=index_id, video_url=video_url)
+    index_id = await get_or_create_index()
+    key = dedup.url_key(video_url)
+    video_id = await run_blocking(dedup.lookup, key, index_id)
+    if video_id:
+        logger.info(f"[UPLOAD_URL] Reusing video {video_id} for {key}")
+        return video_id
+
+    index_id, task = await _create_task(index_id, video_url=video_url)
     logger.info(f"[UPLOAD_URL] Task created: {task.id} for {video_url}")
 
-    while True:
-        task_status = client.tasks.retrieve(task.id)
-        logger.info(f"[UPLOAD_URL] Status: {task_status.status}")
-        if task_status.status == "ready":
-            return task_status.video_id
-        if task_status.status == "failed":
-            raise RuntimeError("Video processing failed")
-        time.sleep(2)
+    with metrics.stage("index_wait", upstream="twelvelabs"):
+        video_id = await task_poller.wait(task.id, label="UPLOAD_URL")
+    await run_blocking(dedup.remember, key, index_id, video_id)
+    return video_id
 
 
-def generate_quiz(video_id: str) -> list:
-    """
-    Generate structured quiz questions based on the video content.
-    Returns a list of question objects with options and correct answer.
-    """
-    quiz_prompt = """Based on this video content, generate exactly 5 multiple choice questions.
+# Questions generated once per video, and how many of them each attempt gets
+QUESTION_BANK_SIZE = int(os.getenv("QUESTION_BANK_SIZE", "30"))
+QUIZ_SIZE = int(os.getenv("QUIZ_SIZE", "5"))
+
+# Bank generations still streaming after their first quiz was handed out
+_bank_builds: set[asyncio.Task] = set()
+
+
+def _question_bank_prompt() -> str:
+    return f"""Based on this video content, generate exactly {QUESTION_BANK_SIZE} multiple choice questions.
     
     Return ONLY a valid JSON array with this exact format, no other text:
     [
-        {
+        {{
             "question": "What is the main topic discussed?",
             "options": ["Option A", "Option B", "Option C", "Option D"],
             "correctAnswer": 0
-        }
+        }}
     ]
     
     Rules:
     - Each question must have exactly 4 options
     - correctAnswer is the index (0-3) of the correct option
     - Questions should test comprehension of the video content
+    - Cover different parts of the video; no two questions may test the same fact
+    - Mix easy, medium and hard questions
     - Return ONLY the JSON array, no markdown or extra text"""
-    
-    res = client.summarize(
-        video_id=video_id,
-        type="summary",
-        prompt=quiz_prompt,
+
+
+async def generate_quiz(video_id: str, on_question=None, learner_id: str | None = None) -> list:
+    """
+    Generate structured quiz questions based on the video content.
+    Returns a list of QUIZ_SIZE question objects with options and correct answer,
+    sampled from the video's question bank (generated once, QUESTION_BANK_SIZE
+    questions) so repeat attempts cost no TwelveLabs call. With `learner_id`,
+    questions that learner has not seen yet are preferred.
+    `on_question(index, question)` is called for each question as soon as it
+    has streamed in (or straight away for a cached bank).
+    """
+    streamed = []
+    first_quiz = asyncio.get_running_loop().create_future()
+
+    def on_streamed(question):
+        if len(streamed) <= QUIZ_SIZE and on_question:
+            on_question(len(streamed) - 1, question)
+        if len(streamed) == QUIZ_SIZE and not first_quiz.done():
+            first_quiz.set_result(None)
+
+    build = asyncio.ensure_future(generate_question_bank(video_id, streamed, on_streamed))
+    _bank_builds.add(build)
+    build.add_done_callback(partial(_bank_build_done, video_id))
+    await asyncio.wait({build, first_quiz}, return_when=asyncio.FIRST_COMPLETED)
+
+    if streamed:
+        # Generated here: the first questions to stream in are this attempt's
+        # quiz (the rest of the bank may still be on its way). A truncated bank is
+        # not cached, but what parsed is still served.
+        quiz = streamed[:QUIZ_SIZE]
+        if learner_id:
+            await run_blocking(quiz_store.mark_seen, learner_id, video_id, quiz)
+        return quiz
+
+    first_quiz.cancel()
+    bank = build.result()
+    if bank:
+        quiz = await run_blocking(quiz_store.sample, video_id, bank, QUIZ_SIZE, learner_id)
+        if on_question:
+            for index, question in enumerate(quiz):
+                on_question(index, question)
+        return quiz
+
+    # Fallback: return a default quiz structure
+    metrics.fallback("quiz")
+    return _fallback_quiz()
+
+
+async def generate_question_bank(video_id: str, streamed: list | None = None, on_streamed=None) -> list | None:
+    """
+    The video's question bank: cached, or generated (and cached) on a miss.
+    While generating, each new valid question is appended to `streamed` and
+    passed to `on_streamed(question)`. Returns None if the output never
+    yielded a complete bank of at least QUIZ_SIZE questions.
+    """
+    bank_prompt = _question_bank_prompt()
+    streamed = [] if streamed is None else streamed
+    keys = set()
+
+    def on_item(question):
+        if not _valid_question(question):
+            logger.warning(f"[QUIZ] Skipping malformed question for {video_id}")
+            return
+        key = quiz_store.question_key(question)
+        if key in keys:
+            return
+        keys.add(key)
+        streamed.append(question)
+        if on_streamed:
+            on_streamed(question)
+
+    async def compute():
+        with metrics.stage("quiz_bank", upstream="twelvelabs"):
+            parser = await _stream_json(_analyze_stream(video_id, bank_prompt), on_item=on_item, expect="array")
+        if parser.container == "array" and parser.done and len(streamed) >= QUIZ_SIZE:
+            logger.info(f"[QUIZ] Built a bank of {len(streamed)} questions for {video_id}")
+            return list(streamed)
+        logger.warning(f"[QUIZ] Incomplete question bank JSON for {video_id} ({len(streamed)} questions parsed)")
+        return None
+
+    return await result_cache.get_or_compute(video_id, "quiz_bank", bank_prompt, GENERATE_MODEL, compute)
+
+
+def _bank_build_done(video_id: str, build: asyncio.Task):
+    _bank_builds.discard(build)
+    if not build.cancelled() and build.exception() is not None:
+        logger.warning(f"[QUIZ] Question bank for {video_id} failed: {build.exception()!r}")
+
+
+def _valid_question(question) -> bool:
+    return (
+        isinstance(question, dict)
+        and isinstance(question.get("question"), str)
+        and isinstance(question.get("options"), list)
+        and isinstance(question.get("correctAnswer"), int)
+        and 0 <= question["correctAnswer"] < len(question["options"])
     )
-    
-    # Parse the JSON response
+
+
+async def _analyze_stream(video_id: str, prompt: str):
+    """
+    Text chunks of a TwelveLabs open-ended analysis as they are generated.
+    """
+    async with tl_generate.slot():
+        async for event in client.analyze_stream(video_id=video_id, prompt=prompt):
+            if event.event_type == "text_generation" and event.text:
+                yield event.text
+
+
+async def _stream_json(chunks, on_item=None, expect: str | None = None) -> JSONStreamParser:
+    """
+    Feed streamed text into a JSONStreamParser expecting `expect` ("array" of
+    objects or "object"), calling `on_item` for each completed array element /
+    object field. Parsing stops once the JSON closes, but the stream is still
+    read to the end: closing an OpenRouter response half-read would drop its
+    pooled connection.
+    """
+    parser = JSONStreamParser(expect)
     try:
-        # Try to extract JSON from the response
-        response_text = res.summary.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```(?:json)?\n?', '', response_text)
-            response_text = re.sub(r'\n?```$', '', response_text)
-        
-        quiz_data = json.loads(response_text)
-        
-        # Validate structure
-        if isinstance(quiz_data, list) and len(quiz_data) > 0:
-            return quiz_data
-    except (json.JSONDecodeError, Exception) as e:
-        logger.warning(f"[QUIZ] Failed to parse quiz JSON: {e}")
-    
-    # Fallback: return a default quiz structure
+        async for text in chunks:
+            if parser.done:
+                continue
+            for item in parser.feed(text):
+                if on_item:
+                    on_item(item)
+    finally:
+        await chunks.aclose()
+    for item in parser.finish():
+        if on_item:
+            on_item(item)
+    return parser
+
+
+def _fallback_quiz() -> list:
     return [
         {
             "question": "What was the main topic of this video?",
@@ -167,26 +427,67 @@ def generate_quiz(video_id: str) -> list:
     ]
 
 
-def generate_gist(video_id: str) -> dict:
+GIST_TYPES = ["title", "topic", "hashtag"]
+
+
+async def generate_gist(video_id: str) -> dict:
     """
     Generate title, topics, hashtags.
     """
-    res = client.gist(video_id=video_id, types=["title", "topic", "hashtag"])
-    return {"title": res.title, "topics": res.topics, "hashtags": res.hashtags}
+    types = GIST_TYPES
+
+    async def compute():
+        async with tl_generate.slot():
+            with metrics.stage("gist", upstream="twelvelabs"):
+                res = await client.gist(video_id=video_id, types=types)
+        return {"title": res.title, "topics": res.topics, "hashtags": res.hashtags}
 
+    return await result_cache.get_or_compute(video_id, "gist", ",".join(types), GENERATE_MODEL, compute)
 
-def generate_feedback(video_id: str, correct_answers: list, wrong_answers: list) -> dict:
+
+async def generate_quiz_and_gist(video_id: str, on_result=None, on_question=None, learner_id: str | None = None) -> tuple:
     """
-    Generate personalized feedback based on quiz performance.
-    Analyzes language concepts the user understands and needs to improve.
+    Run generate_quiz and generate_gist concurrently, each with its own timeout.
+    A failure in one does not affect the other: a failed quiz falls back to the
+    default quiz and a failed gist to empty fields (UpstreamBusy is raised
+    instead, so the caller can answer 429). `on_result(name, value, error)`
+    (a coroutine function) is awaited as soon as each one finishes; `on_question` and `learner_id` are
+    passed to generate_quiz.
     """
-    feedback_prompt = f"""Based on this language learning video and the user's quiz results, provide personalized feedback.
+    start = time.perf_counter()
+
+    async def run(name, fn, fallback):
+        call_start = time.perf_counter()
+        error = None
+        try:
+            value = await asyncio.wait_for(fn(video_id), timeout=QUIZ_GIST_TIMEOUT)
+        except limits.UpstreamBusy:
+            raise
+        except Exception as e:
+            logger.warning(f"[FANOUT] {name} failed for {video_id}: {e!r}")
+            metrics.fallback(name)
+            value, error = fallback, e
+        logger.info(f"[FANOUT] {name} for {video_id} took {time.perf_counter() - call_start:.2f}s")
+        if on_result:
+            await on_result(name, value, error)
+        return value
+
+    quiz, gist = await asyncio.gather(
+        run("quiz", partial(generate_quiz, on_question=on_question, learner_id=learner_id), _fallback_quiz()),
+        run("gist", generate_gist, {"title": None, "topics": None, "hashtags": None}),
+    )
+    logger.info(f"[FANOUT] quiz+gist for {video_id} took {time.perf_counter() - start:.2f}s")
+    return quiz, gist
+
+
+def _feedback_prompt(correct_answers: list, wrong_answers: list) -> str:
+    return f"""Based on this language learning video and the user's quiz results, provide personalized feedback.
 
 QUESTIONS ANSWERED CORRECTLY (concepts they understand well):
-{json.dumps(correct_answers, indent=2)}
+{_compact_json(correct_answers)}
 
 QUESTIONS ANSWERED INCORRECTLY (concepts they struggled with):
-{json.dumps(wrong_answers, indent=2)}
+{_compact_json(wrong_answers)}
 
 Analyze the video content and the quiz results to provide feedback. Return ONLY valid JSON with this exact format:
 {{
@@ -203,29 +504,33 @@ Rules:
 - If they got everything wrong, be extra encouraging
 - Return ONLY the JSON object, no markdown or extra text"""
 
-    res = client.summarize(
-        video_id=video_id,
-        type="summary",
-        prompt=feedback_prompt,
-    )
-    
-    try:
-        response_text = res.summary.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```(?:json)?\n?', '', response_text)
-            response_text = re.sub(r'\n?```$', '', response_text)
-        
-        feedback_data = json.loads(response_text)
-        
-        # Validate structure
-        if isinstance(feedback_data, dict) and "strengths" in feedback_data:
-            return feedback_data
-    except (json.JSONDecodeError, Exception) as e:
-        logger.warning(f"[FEEDBACK] Failed to parse feedback JSON: {e}")
-    
-    # Fallback response
+
+def _compact_json(value) -> str:
+    # No indentation or escaped accents: quiz text is mostly non-English
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+async def perfect_score_feedback(video_id: str, correct_answers: list) -> dict:
+    """
+    Feedback for an attempt with every answer right, built locally instead of
+    asking TwelveLabs. Strengths are concepts (the video's gist topics when
+    cached, else general skills), never question text, since they feed the
+    learner profile.
+    """
+    gist = await run_blocking(result_cache.get, video_id, "gist", ",".join(GIST_TYPES), GENERATE_MODEL)
+    topics = [t for t in (gist or {}).get("topics") or [] if isinstance(t, str) and t.strip()]
+    return {
+        "strengths": topics[:3] or ["Listening comprehension", "Vocabulary recognition"],
+        "areas_to_improve": [],
+        "tips": [
+            "Rewatch the video without subtitles to test your listening",
+            "Try a longer or faster-paced video on the same topic",
+        ],
+        "encouragement": f"Perfect score - {len(correct_answers)}/{len(correct_answers)}! You clearly followed this video.",
+    }
+
+
+def _fallback_feedback() -> dict:
     return {
         "strengths": ["You completed the quiz!"],
         "areas_to_improve": ["Keep practicing with more videos"],
@@ -234,7 +539,118 @@ Rules:
     }
 
 
-def generate_learning_plan(all_feedback: list) -> dict:
+def _valid_feedback(feedback) -> bool:
+    return isinstance(feedback, dict) and "strengths" in feedback
+
+
+async def generate_feedback(video_id: str, correct_answers: list, wrong_answers: list) -> dict:
+    """
+    Generate personalized feedback based on quiz performance.
+    Analyzes language concepts the user understands and needs to improve.
+    """
+    feedback_prompt = _feedback_prompt(correct_answers, wrong_answers)
+
+    async def compute():
+        with metrics.stage("feedback", upstream="twelvelabs"):
+            parser = await _stream_json(_analyze_stream(video_id, feedback_prompt), expect="object")
+        feedback_data = parser.result()
+        if parser.done and _valid_feedback(feedback_data):
+            return feedback_data
+        logger.warning(f"[FEEDBACK] Failed to parse feedback JSON for {video_id}")
+        return None
+
+    feedback_data = await result_cache.get_or_compute(video_id, "feedback", feedback_prompt, GENERATE_MODEL, compute)
+    if feedback_data is not None:
+        return feedback_data
+
+    # Fallback response
+    metrics.fallback("feedback")
+    return _fallback_feedback()
+
+
+async def cached_feedback(video_id: str, correct_answers: list, wrong_answers: list) -> dict | None:
+    """
+    Feedback already cached for exactly this attempt, if any.
+    """
+    prompt = _feedback_prompt(correct_answers, wrong_answers)
+    return await run_blocking(result_cache.get, video_id, "feedback", prompt, GENERATE_MODEL)
+
+
+async def generate_feedback_batch(video_id: str, attempts: list, on_feedback=None) -> list:
+    """
+    Feedback for several quiz attempts on one video from a single TwelveLabs
+    call. `attempts` is a list of (correct_answers, wrong_answers); returns a
+    list in the same order with None where the combined response had nothing
+    usable. Each result is cached as if it came from generate_feedback, and
+    `on_feedback(index, feedback)` fires as soon as it streams in.
+    """
+    blocks = []
+    for i, (correct, wrong) in enumerate(attempts):
+        blocks.append(
+            f"ATTEMPT {i}:\n"
+            f"- Answered correctly: {_compact_json([a['question'] for a in correct])}\n"
+            f"- Answered incorrectly: {_compact_json(wrong)}"
+        )
+    attempts_text = "\n\n".join(blocks)
+    prompt = f"""Based on this language learning video, give personalized feedback to each of the {len(attempts)} quiz attempts below (different learners, same quiz).
+
+{attempts_text}
+
+Return ONLY a valid JSON array with one object per attempt, in attempt order, with this exact format:
+[
+    {{
+        "attempt": 0,
+        "strengths": ["2-3 specific language concepts or skills they demonstrated understanding of based on correct answers"],
+        "areas_to_improve": ["2-3 specific language concepts they need to practice based on wrong answers"],
+        "tips": ["2-3 actionable tips referencing specific parts of the video to help them improve"],
+        "encouragement": "A brief encouraging message about their progress"
+    }}
+]
+
+Rules:
+- Be specific about language concepts (vocabulary, grammar, pronunciation, comprehension, etc.)
+- Reference actual content from the video in your tips
+- If an attempt got everything correct, focus on reinforcing their strengths
+- If an attempt got everything wrong, be extra encouraging
+- Return ONLY the JSON array, no markdown or extra text"""
+
+    results = [None] * len(attempts)
+
+    def on_item(item):
+        index = item.get("attempt") if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 0 <= index < len(attempts) or results[index] is not None:
+            logger.warning(f"[FEEDBACK] Skipping unusable batch entry for {video_id}")
+            return
+        feedback = {k: v for k, v in item.items() if k != "attempt"}
+        if not _valid_feedback(feedback):
+            return
+        results[index] = feedback
+        if on_feedback:
+            on_feedback(index, feedback)
+
+    def cache_parsed():
+        for (correct, wrong), feedback in zip(attempts, results):
+            if feedback is not None:
+                result_cache.put(video_id, "feedback", _feedback_prompt(correct, wrong), GENERATE_MODEL, feedback)
+
+    try:
+        with metrics.stage("feedback_batch", upstream="twelvelabs"):
+            await _stream_json(_analyze_stream(video_id, prompt), on_item=on_item, expect="array")
+    finally:
+        # Cached once the stream ends (even a broken one), off the event loop
+        await run_blocking(cache_parsed)
+    missing = sum(r is None for r in results)
+    logger.info(f"[FEEDBACK] Batch of {len(attempts)} for {video_id}: {len(attempts) - missing} parsed")
+    return results
+
+
+LEARNING_PLAN_MODEL = "openai/gpt-4o-mini"
+# Histories at least this long get the local, clustering-based plan instead
+# of an OpenRouter call (0 = always call OpenRouter)
+LOCAL_PLAN_MIN_QUIZZES = int(os.getenv("LOCAL_PLAN_MIN_QUIZZES", "0"))
+
+
+async def generate_learning_plan(all_feedback: list) -> dict:
     """
     Use OpenRouter to analyze all user feedback and generate a personalized learning plan.
     Returns top 3 strengths, top 3 areas to improve, and actionable recommendations.
@@ -242,7 +658,9 @@ def generate_learning_plan(all_feedback: list) -> dict:
     openrouter_key = os.getenv("OPENROUTER_API_KEY")
     if not openrouter_key:
         logger.warning("[LEARNING_PLAN] OPENROUTER_API_KEY not set, using fallback")
-        return _fallback_learning_plan(all_feedback)
+        return await run_blocking(_fallback_learning_plan, all_feedback)
+    if LOCAL_PLAN_MIN_QUIZZES and len(all_feedback) >= LOCAL_PLAN_MIN_QUIZZES:
+        return await run_blocking(_fallback_learning_plan, all_feedback)
     
     # Aggregate all strengths and areas to improve
     all_strengths = []
@@ -280,44 +698,115 @@ Rules:
 - Return ONLY the JSON object, no markdown or extra text"""
 
     try:
-        response = httpx.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {openrouter_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "openai/gpt-4o-mini",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-            },
-            timeout=30.0,
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        content = result["choices"][0]["message"]["content"].strip()
-        
-        # Remove markdown code blocks if present
-        if content.startswith("```"):
-            content = re.sub(r'^```(?:json)?\n?', '', content)
-            content = re.sub(r'\n?```$', '', content)
-        
-        plan_data = json.loads(content)
-        
+        with metrics.stage("learning_plan", upstream="openrouter"):
+            parser = await _stream_json(
+                openrouter.stream_chat(LEARNING_PLAN_MODEL, prompt, timeout=30.0, temperature=0.7), expect="object"
+            )
+        plan_data = parser.result()
         if isinstance(plan_data, dict) and "top_strengths" in plan_data:
             return plan_data
-            
+        logger.warning("[LEARNING_PLAN] Response had no usable JSON")
+
+    except limits.UpstreamBusy:
+        raise
     except Exception as e:
         logger.error(f"[LEARNING_PLAN] OpenRouter request failed: {e}")
     
-    return _fallback_learning_plan(all_feedback)
+    metrics.fallback("learning_plan")
+    return await run_blocking(_fallback_learning_plan, all_feedback)
+
+
+async def generate_learning_plan_for_profile(profile: dict) -> dict:
+    """
+    Learning plan from a learner's rolling profile (learner_profile.py): top
+    concept counts, the previous plan's summary and feedback since then, so
+    the prompt stays the same size however many quizzes were taken. Plans
+    are cached until the learner records another quiz.
+    """
+    learner_id = profile["learner_id"]
+    if not os.getenv("OPENROUTER_API_KEY"):
+        logger.warning("[LEARNING_PLAN] OPENROUTER_API_KEY not set, using fallback")
+        return await run_blocking(
+            _fallback_learning_plan_from_counts, dict(profile["strengths"]), dict(profile["areas_to_improve"])
+        )
+    if LOCAL_PLAN_MIN_QUIZZES and profile["quizzes"] >= LOCAL_PLAN_MIN_QUIZZES:
+        return await run_blocking(
+            _fallback_learning_plan_from_counts, dict(profile["strengths"]), dict(profile["areas_to_improve"])
+        )
+
+    def counted(concepts):
+        return "\n".join(f"- {text} ({count}x)" for text, count in concepts) or "- (none yet)"
+
+    recent = [
+        {"strengths": fb.get("strengths", []), "areas_to_improve": fb.get("areas_to_improve", [])}
+        for fb in profile["recent"]
+    ]
+    prompt = f"""You are a language learning coach. Analyze this student's quiz history and create a personalized learning plan.
+
+QUIZ PERFORMANCE SUMMARY:
+- Total quizzes completed: {profile["quizzes"]}
+
+MOST FREQUENTLY RECORDED STRENGTHS (with how often they were recorded):
+{counted(profile["strengths"])}
+
+MOST FREQUENTLY RECORDED AREAS TO IMPROVE (with how often they were recorded):
+{counted(profile["areas_to_improve"])}
+
+PREVIOUS LEARNING PLAN (summary):
+{json.dumps(profile["summary"], indent=2) if profile["summary"] else "None yet"}
+
+QUIZZES SINCE THE PREVIOUS PLAN:
+{json.dumps(recent, indent=2) if recent else "None"}
+
+Based on this data, create a comprehensive learning plan. Return ONLY valid JSON with this exact format:
+{{
+    "top_strengths": ["The 3 most consistent strengths this student has demonstrated"],
+    "top_areas_to_improve": ["The 3 most important areas they need to focus on"],
+    "learning_recommendations": ["3-5 specific, actionable recommendations to improve their language skills"],
+    "next_steps": "A brief paragraph describing what they should focus on next",
+    "overall_assessment": "A brief encouraging overall assessment of their progress"
+}}
+
+Rules:
+- Consolidate similar concepts (e.g., "vocabulary" and "word retention" are the same)
+- Prioritize by frequency and importance
+- Note progress relative to the previous plan when the recent quizzes show it
+- Be specific and actionable in recommendations
+- Be encouraging but honest
+- Return ONLY the JSON object, no markdown or extra text"""
+
+    async def compute():
+        try:
+            with metrics.stage("learning_plan", upstream="openrouter"):
+                parser = await _stream_json(
+                    openrouter.stream_chat(LEARNING_PLAN_MODEL, prompt, timeout=30.0, temperature=0.7), expect="object"
+                )
+        except limits.UpstreamBusy:
+            raise
+        except Exception as e:
+            logger.error(f"[LEARNING_PLAN] OpenRouter request failed: {e}")
+            return None
+        plan_data = parser.result()
+        if isinstance(plan_data, dict) and "top_strengths" in plan_data:
+            await run_blocking(learner_profile.save_summary, learner_id, plan_data)
+            return plan_data
+        logger.warning("[LEARNING_PLAN] Response had no usable JSON")
+        return None
+
+    # Keyed by quiz count rather than the prompt: the prompt changes once the
+    # summary is saved, but the plan only needs redoing after a new quiz
+    state = json.dumps({"learner_id": learner_id, "quizzes": profile["quizzes"]})
+    plan = await result_cache.get_or_compute(f"learner:{learner_id}", "learning_plan", state, LEARNING_PLAN_MODEL, compute)
+    if plan is not None:
+        return plan
+    metrics.fallback("learning_plan")
+    return await run_blocking(
+        _fallback_learning_plan_from_counts, dict(profile["strengths"]), dict(profile["areas_to_improve"])
+    )
 
 
 def _fallback_learning_plan(all_feedback: list) -> dict:
-    """Simple frequency-based fallback when OpenRouter is unavailable."""
-    from collections import Counter
-    
+    """Frequency-based plan (near-duplicate concepts merged) with no LLM call."""
     all_strengths = []
     all_areas = []
     
@@ -325,17 +814,19 @@ def _fallback_learning_plan(all_feedback: list) -> dict:
         all_strengths.extend(fb.get("strengths", []))
         all_areas.extend(fb.get("areas_to_improve", []))
     
-    # Count frequencies
-    strength_counts = Counter(all_strengths)
-    area_counts = Counter(all_areas)
-    
-    top_strengths = [s for s, _ in strength_counts.most_common(3)]
-    top_areas = [a for a, _ in area_counts.most_common(3)]
+    return _fallback_learning_plan_from_counts(Counter(all_strengths), Counter(all_areas))
+
+
+def _fallback_learning_plan_from_counts(strength_counts: dict, area_counts: dict) -> dict:
+    top_strengths = top_concepts(strength_counts, 3)
+    top_areas = top_concepts(area_counts, 3)
     
     return {
         "top_strengths": top_strengths if top_strengths else ["Keep practicing to discover your strengths!"],
         "top_areas_to_improve": top_areas if top_areas else ["Continue learning to identify areas for growth"],
         "learning_recommendations": [
+            f"Pick a video that covers {area.lower()} and retake its quiz" for area in top_areas[:2]
+        ] + [
             "Watch more videos in your target language",
             "Practice consistently every day",
             "Focus on one concept at a time"
@@ -345,202 +836,137 @@ def _fallback_learning_plan(all_feedback: list) -> dict:
     }
 
 
-def generate_frenzy_pdf(language: str) -> str:
+async def generate_frenzy_pdf(language: str, file_path: str | None = None, reserved: bool = False) -> str:
     """
     Generate a 14-page PDF study guide for the specified language.
     Uses OpenRouter (Gemini) for content and Matplotlib for infographics.
     Returns the absolute path to the generated PDF.
+    Raises RenderQueueFull when the render pool is saturated; `reserved`
+    means the caller already holds a render_pool slot for it.
     """
-    import io
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image as RLImage
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    import matplotlib
-    matplotlib.use('Agg') # Non-interactive backend
-    import matplotlib.pyplot as plt
-
-    # Ensure output directory exists (users mostly run from root or backend)
-    # let's write to a temp folder or just current dir/generated_pdfs
-    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generated_pdfs")
-    os.makedirs(output_dir, exist_ok=True)
-    filename = f"Fourteen_Day_Frenzy_{language}_{int(time.time())}.pdf"
-    file_path = os.path.join(output_dir, filename)
-
-    doc = SimpleDocTemplate(file_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    # Custom styles
-    title_style = ParagraphStyle(
-        'FrenzyTitle',
-        parent=styles['Title'],
-        fontSize=36,
-        spaceAfter=30,
-        textColor=colors.HexColor('#58cc02'),
-        alignment=1 # Center
-    )
-    heading_style = ParagraphStyle(
-        'FrenzyHeading',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1cb0f6'),
-        spaceAfter=12
-    )
-    body_style = ParagraphStyle(
-        'FrenzyBody',
-        parent=styles['Normal'],
-        fontSize=12,
-        leading=16,
-        spaceAfter=12
-    )
+    days_content = await _generate_frenzy_content(language)
 
-    story = []
+    # ReportLab + matplotlib are CPU-bound; render in a worker process
+    with metrics.stage("frenzy_render"):
+        return await render_pool.submit(render_frenzy_pdf, language, days_content, file_path, reserved=reserved)
 
-    # --- Page 1: Title Page ---
-    story.append(Spacer(1, 2*inch))
-    story.append(Paragraph(f"Fourteen Day Frenzy: {language}", title_style))
-    story.append(Spacer(1, 0.5*inch))
-    story.append(Paragraph("✈️ Your Ultimate 2-Week Beginner Guide", styles['Heading2']))
-    story.append(Spacer(1, 2*inch))
-    story.append(Paragraph("Generated by LanGain AI", styles['Normal']))
-    story.append(PageBreak())
 
-    # --- Pages 2-13: Content ---
-    # We will generate 12 days of content in one go or batches provided by LLM
-    openrouter_key = os.getenv("OPENROUTER_API_KEY")
-    
-    # Default content if API fails
-    days_content = []
-    
-    if openrouter_key:
-        prompt = f"""
-        create a comprehensive 12-day beginner study plan for learning {language}. 
-        For each day, provide a 'title' (e.g., 'Greetings & Introductions') and a very detailed 'body' (at least 300 words).
-        The body MUST contain:
-        - Specific vocabulary lists with translations in a table-like format
-        - Clear grammar explanations with examples
-        - Common phrases and usage tips
-        - A small practice exercise
-        
-        Strictly follow this JSON format:
-        [
-            {{"day": 1, "title": "Basics", "body": "..."}},
-            ...
-            {{"day": 12, "title": "Review", "body": "..."}}
-        ]
-        """
-        try:
-            response = httpx.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openrouter_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "google/gemini-pro-1.5", 
-                    "messages": [{"role": "user", "content": prompt}],
-                },
-                timeout=90.0
-            )
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            # Clean md
-            content = re.sub(r'^```(?:json)?\n?', '', content.strip())
-            content = re.sub(r'\n?```$', '', content)
-            days_content = json.loads(content)
-        except Exception as e:
-            logger.error(f"[PDF] LLM Generation failed: {e}")
-
-    # If LLM failed, use rich fallback content
-    if not days_content or len(days_content) < 12:
-        logger.warning("[PDF] Using rich fallback content due to LLM failure")
-        days_content = []
-        
-        # Generic structure to be adapted for the specific language
-        topics = [
-            ("The Basics & Pronunciation", "Master the alphabet, key sounds, and basic greetings like 'Hello' and 'Goodbye'."),
-            ("Introductions & Numbers", "Learn to introduce yourself, count to 20, and ask 'How are you?'."),
-            ("Common Phrases & Politeness", "Essential survival phrases: 'Please', 'Thank you', 'Where is...?', 'I don't understand'."),
-            ("Food & Dining", "Ordering at a restaurant, naming common foods, and asking for the bill."),
-            ("Travel & Directions", "Asking for directions, taking a taxi, and navigating public transport."),
-            ("Family & Friends", "Talking about family members, describing people, and possessives ('my', 'your')."),
-            ("Time & Dates", "Days of the week, months, telling time, and making appointments."),
-            ("Shopping & Colors", "Buying items, asking for prices, sizes, and colors."),
-            ("Work & Hobbies", "Discussing your job, school, and what you like to do for fun."),
-            ("Emotions & Feelings", "Expressing happiness, sadness, hunger, thirst, and health."),
-            ("Grammar: Present Tense", "Constructing simple sentences with common verbs (to be, to have, to do)."),
-            ("Review & Next Steps", "Consolidating detailed knowledge and planning your continued learning journey.")
-        ]
-        
-        for i, (title, desc) in enumerate(topics):
-            day_num = i + 1
-            days_content.append({
-                "day": day_num,
-                "title": title,
-                "body": f"""
-                <b>Objective:</b> {desc}<br/><br/>
-                <b>Key Vocabulary:</b><br/>
-                - Hello / Hi<br/>
-                - Yes / No<br/>
-                - Please / Thank you<br/>
-                - Excuse me<br/><br/>
-                <b>Grammar Tip:</b><br/>
-                Focus on the pronunciation of vowels for {language}. Unlike English, they are usually short and distinct.<br/><br/>
-                <b>Practice:</b><br/>
-                Stand in front of a mirror and practice introducing yourself three times.
-                <i>(Note: To get fully customized content, ensure OPENROUTER_API_KEY is set in backend/.env)</i>
-                """
-            })
-
-    # Add content pages
-    for day in days_content[:12]:
-        day_num = day.get('day', 0)
-        title_text = day.get('title', '')
-        
-        # Avoid double "Day X: Day X:" if LLM returns it in title
-        if title_text.lower().startswith(f"day {day_num}"):
-            header_text = title_text
-        else:
-            header_text = f"Day {day_num}: {title_text}"
-            
-        story.append(Paragraph(header_text, heading_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Replace newlines w/ breaks, bold markers w/ tags
-        body_text = day.get('body', '')
-        # Simple markdown to HTML conversion for ReportLab Paragraphs
-        body_text = body_text.replace('\n', '<br/>')
-        body_text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', body_text)
-        
-        story.append(Paragraph(body_text, body_style))
-        story.append(PageBreak())
-
-    # --- Page 14: Infographics ---
-    story.append(Paragraph(f"{language} by the Numbers", heading_style))
-    story.append(Spacer(1, 0.5*inch))
-
-    # Generate Chart 1: Speakers
-    # Mock data - in real app, could fetch real stats
-    labels = ['Native Speakers', 'L2 Speakers', 'Learners']
-    sizes = [40, 30, 30] 
-    colors_list = ['#58cc02', '#1cb0f6', '#ff4b4b']
-    
-    plt.figure(figsize=(6, 4))
-    plt.pie(sizes, labels=labels, colors=colors_list, autopct='%1.1f%%', startangle=140)
-    plt.title(f'Global {language} Speaker Distribution')
-    
-    chart_path = os.path.join(output_dir, f"chart_{int(time.time())}.png")
-    plt.savefig(chart_path)
-    plt.close()
-    
-    story.append(RLImage(chart_path, width=6*inch, height=4*inch))
-    story.append(Paragraph("Data estimated for visualization purposes.", styles['Italic']))
+async def generate_frenzy_pdf_bytes(language: str, reserved: bool = False) -> bytes:
+    """
+    Like generate_frenzy_pdf, but the PDF (and its chart) never touch the disk.
+    """
+    days_content = await _generate_frenzy_content(language)
+    with metrics.stage("frenzy_render"):
+        return await render_pool.submit(render_frenzy_pdf_bytes, language, days_content, reserved=reserved)
+
+
+# Skeleton of the 12-day plan: each day is generated on its own from its topic,
+# and the same topics drive the generic fallback content.
+FRENZY_TOPICS = [
+    ("The Basics & Pronunciation", "Master the alphabet, key sounds, and basic greetings like 'Hello' and 'Goodbye'."),
+    ("Introductions & Numbers", "Learn to introduce yourself, count to 20, and ask 'How are you?'."),
+    ("Common Phrases & Politeness", "Essential survival phrases: 'Please', 'Thank you', 'Where is...?', 'I don't understand'."),
+    ("Food & Dining", "Ordering at a restaurant, naming common foods, and asking for the bill."),
+    ("Travel & Directions", "Asking for directions, taking a taxi, and navigating public transport."),
+    ("Family & Friends", "Talking about family members, describing people, and possessives ('my', 'your')."),
+    ("Time & Dates", "Days of the week, months, telling time, and making appointments."),
+    ("Shopping & Colors", "Buying items, asking for prices, sizes, and colors."),
+    ("Work & Hobbies", "Discussing your job, school, and what you like to do for fun."),
+    ("Emotions & Feelings", "Expressing happiness, sadness, hunger, thirst, and health."),
+    ("Grammar: Present Tense", "Constructing simple sentences with common verbs (to be, to have, to do)."),
+    ("Review & Next Steps", "Consolidating detailed knowledge and planning your continued learning journey.")
+]
+FRENZY_MODEL = "google/gemini-pro-1.5"
+# Guides younger than this are served as-is; older ones are served once more
+# while a fresh copy renders in the background. Cached days expire at the
+# same age, so the refreshed guide gets new content.
+FRENZY_FRESH_SECONDS = int(os.getenv("FRENZY_FRESH_HOURS", "168")) * 3600
+# Day requests in flight at once per guide, per-day timeout and retries
+FRENZY_DAY_CONCURRENCY = int(os.getenv("FRENZY_DAY_CONCURRENCY", "4"))
+FRENZY_DAY_TIMEOUT = 60.0
+FRENZY_DAY_RETRIES = 2
+
+
+async def _generate_frenzy_content(language: str) -> list:
+    """
+    Generate the 12 days concurrently (bounded), one request per day. Each day
+    is cached and retried on its own; a day that still fails gets generic content.
+    """
+    if not os.getenv("OPENROUTER_API_KEY"):
+        logger.warning("[PDF] OPENROUTER_API_KEY not set, using rich fallback content")
+        return [_fallback_frenzy_day(language, day) for day in range(1, len(FRENZY_TOPICS) + 1)]
+
+    start = time.perf_counter()
+    slots = asyncio.Semaphore(FRENZY_DAY_CONCURRENCY)
+
+    async def bounded(day):
+        async with slots:
+            return await _generate_frenzy_day(language, day)
+
+    days_content = await asyncio.gather(*(bounded(day) for day in range(1, len(FRENZY_TOPICS) + 1)))
+    logger.info(f"[PDF] Generated {len(days_content)} days for {language} in {time.perf_counter() - start:.2f}s")
+    return days_content
+
+
+async def _generate_frenzy_day(language: str, day: int) -> dict:
+    title, desc = FRENZY_TOPICS[day - 1]
+    prompt = f"""
+    You are writing Day {day} of a 12-day beginner study plan for learning {language}.
+    Today's topic: {title}. {desc}
+    Write a very detailed 'body' (at least 300 words) for this day.
+    The body MUST contain:
+    - Specific vocabulary lists with translations in a table-like format
+    - Clear grammar explanations with examples
+    - Common phrases and usage tips
+    - A small practice exercise
+
+    Strictly follow this JSON format:
+    {{"day": {day}, "title": "{title}", "body": "..."}}
+    """
+
+    async def compute():
+        for attempt in range(1, FRENZY_DAY_RETRIES + 2):
+            try:
+                with metrics.stage("frenzy_day", upstream="openrouter"):
+                    parser = await _stream_json(
+                        openrouter.stream_chat(FRENZY_MODEL, prompt, timeout=FRENZY_DAY_TIMEOUT), expect="object"
+                    )
+                data = parser.result()
+                if isinstance(data, dict) and data.get("body"):
+                    return {"day": day, "title": data.get("title") or title, "body": data["body"]}
+                logger.warning(f"[PDF] Day {day} ({language}) attempt {attempt}: missing body")
+            except limits.UpstreamBusy:
+                raise
+            except Exception as e:
+                logger.warning(f"[PDF] Day {day} ({language}) attempt {attempt} failed: {e}")
+        return None
+
+    content = await result_cache.get_or_compute(
+        f"frenzy:{language}", f"frenzy_day_{day}", prompt, FRENZY_MODEL, compute, max_age=FRENZY_FRESH_SECONDS
+    )
+    if content is None:
+        logger.error(f"[PDF] Day {day} ({language}) failed, using fallback content")
+        metrics.fallback("frenzy_day")
+        return _fallback_frenzy_day(language, day)
+    return content
 
-    # Build PDF
-    doc.build(story)
-    
-    # Cleanup chart
-    if os.path.exists(chart_path):
-        os.remove(chart_path)
 
-    return file_path
+def _fallback_frenzy_day(language: str, day: int) -> dict:
+    title, desc = FRENZY_TOPICS[day - 1]
+    return {
+        "day": day,
+        "title": title,
+        "body": f"""
+        <b>Objective:</b> {desc}<br/><br/>
+        <b>Key Vocabulary:</b><br/>
+        - Hello / Hi<br/>
+        - Yes / No<br/>
+        - Please / Thank you<br/>
+        - Excuse me<br/><br/>
+        <b>Grammar Tip:</b><br/>
+        Focus on the pronunciation of vowels for {language}. Unlike English, they are usually short and distinct.<br/><br/>
+        <b>Practice:</b><br/>
+        Stand in front of a mirror and practice introducing yourself three times.
+        <i>(Note: To get fully customized content, ensure OPENROUTER_API_KEY is set in backend/.env)</i>
+        """
+    }
@@ -0,0 +1,43 @@
+import os
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Everything persistent lives in one SQLite file so it is shared by every
+# uvicorn worker on the host (WAL mode lets readers and a writer overlap).
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+DB_PATH = os.path.join(DATA_DIR, "backend.sqlite3")
+
+_local = threading.local()
+
+
+def connect(schema: str = "") -> sqlite3.Connection:
+    """
+    Return this thread's connection, applying `schema` (idempotent DDL) once.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _local.schemas = set()
+    if schema and schema not in _local.schemas:
+        conn.executescript(schema)
+        _local.schemas.add(schema)
+    return conn
+
+
+# Bounded pool for blocking I/O (SQLite, disk copies, etc.) that cannot be
+# awaited natively; PDF rendering has its own process pool (render_pool.py).
+_io_executor = ThreadPoolExecutor(max_workers=int(os.getenv("IO_WORKERS", "8")), thread_name_prefix="io")
+
+
+async def run_blocking(fn, *args):
+    """
+    Run a blocking callable on the bounded I/O pool without stalling the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, fn, *args)
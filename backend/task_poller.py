@@ -0,0 +1,134 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Indexing usually takes from tens of seconds to a few minutes, so the first
+# check waits a bit, then backs off towards TASK_POLL_MAX_DELAY.
+TASK_POLL_INITIAL_DELAY = float(os.getenv("TASK_POLL_INITIAL_DELAY", "5"))
+TASK_POLL_MAX_DELAY = float(os.getenv("TASK_POLL_MAX_DELAY", "30"))
+TASK_POLL_BACKOFF = 1.6
+TASK_POLL_JITTER = 0.2
+# Give up on a task that has not finished after this long
+TASK_POLL_DEADLINE = float(os.getenv("TASK_POLL_DEADLINE", "1800"))
+# Status calls in flight at once per sweep
+TASK_POLL_CONCURRENCY = 10
+
+
+@dataclass
+class _Pending:
+    task_id: str
+    label: str
+    future: asyncio.Future
+    deadline: float
+    next_poll: float
+    delay: float
+    status: str | None = None
+
+
+class TaskPoller:
+    """
+    Single background loop that polls every pending TwelveLabs task with
+    jittered exponential backoff and resolves the waiters' futures.
+    """
+
+    def __init__(self, retrieve):
+        self._retrieve = retrieve
+        self._pending: dict[str, _Pending] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._loop_task: asyncio.Task | None = None
+
+    async def wait(self, task_id: str, label: str = "TASK", deadline: float = TASK_POLL_DEADLINE) -> str:
+        """
+        Wait for `task_id` to finish and return its video_id.
+        """
+        pending = self._pending.get(task_id)
+        if pending is None:
+            now = time.monotonic()
+            pending = _Pending(
+                task_id=task_id,
+                label=label,
+                future=asyncio.get_running_loop().create_future(),
+                deadline=now + deadline,
+                next_poll=now + _jitter(TASK_POLL_INITIAL_DELAY),
+                delay=TASK_POLL_INITIAL_DELAY,
+            )
+            self._pending[task_id] = pending
+            self._ensure_running()
+            self._wakeup.set()
+        return await asyncio.shield(pending.future)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+    def _ensure_running(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        slots = asyncio.Semaphore(TASK_POLL_CONCURRENCY)
+        while True:
+            now = time.monotonic()
+            due = [p for p in self._pending.values() if p.next_poll <= now]
+            if due:
+                await asyncio.gather(*(self._poll(p, slots) for p in due))
+                continue
+
+            self._wakeup.clear()
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, min(p.next_poll for p in self._pending.values()) - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, pending: _Pending, slots: asyncio.Semaphore):
+        if pending.future.done():
+            self._pending.pop(pending.task_id, None)
+            return
+        try:
+            async with slots:
+                task = await self._retrieve(pending.task_id)
+        except Exception as e:
+            logger.warning(f"[{pending.label}] Status check for {pending.task_id} failed: {e}")
+            task = None
+
+        if task is not None and task.status != pending.status:
+            logger.info(f"[{pending.label}] Task {pending.task_id} status: {task.status}")
+            pending.status = task.status
+
+        if task is not None and task.status == "ready":
+            self._resolve(pending, result=task.video_id)
+        elif task is not None and task.status == "failed":
+            self._resolve(pending, error=RuntimeError("Video processing failed"))
+        elif time.monotonic() >= pending.deadline:
+            self._resolve(pending, error=TimeoutError(f"Task {pending.task_id} did not finish in time"))
+        else:
+            pending.delay = min(pending.delay * TASK_POLL_BACKOFF, TASK_POLL_MAX_DELAY)
+            pending.next_poll = time.monotonic() + _jitter(pending.delay)
+
+    def _resolve(self, pending: _Pending, result=None, error: Exception | None = None):
+        self._pending.pop(pending.task_id, None)
+        if pending.future.done():
+            return
+        if error:
+            pending.future.set_exception(error)
+        else:
+            pending.future.set_result(result)
+
+
+def _jitter(delay: float) -> float:
+    return delay * random.uniform(1 - TASK_POLL_JITTER, 1 + TASK_POLL_JITTER)
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# The backend reads its configuration at import time: point everything it
+# persists at a throwaway directory and keep it off the real upstreams
+_data_dir = tempfile.mkdtemp(prefix="sbhacks_tests_")
+os.environ.update({
+    "DATA_DIR": _data_dir,
+    "UPLOAD_SPOOL_DIR": os.path.join(_data_dir, "spool"),
+    "TL_API_KEY": "test",
+    "OPENROUTER_API_KEY": "test",
+    "OPENROUTER_HTTP2": "0",
+    "FRENZY_IN_MEMORY": "1",
+    "CATALOG_STORAGE": "none",
+    "TASK_POLL_INITIAL_DELAY": "0.5",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
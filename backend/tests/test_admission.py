@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+import services
+from limits import UpstreamBusy
+from render_pool import render_pool
+
+
+async def _busy(*args, **kwargs):
+    raise UpstreamBusy("openrouter", 7)
+
+
+async def _request(method: str, path: str, **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+
+@pytest.mark.parametrize("target, method, path, kwargs", [
+    ("get_frenzy_guide", "GET", "/frenzy/Spanish", {}),
+    ("_feedback_for", "POST", "/feedback", {"json": {"video_id": "v1"}}),
+    ("generate_learning_plan", "POST", "/learning-plan", {"json": {"feedback_history": []}}),
+])
+def test_busy_upstream_answers_429_with_retry_after(monkeypatch, target, method, path, kwargs):
+    monkeypatch.setattr(main, target, _busy)
+    response = asyncio.run(_request(method, path, **kwargs))
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert "openrouter is busy" in response.json()["detail"]
+
+
+def test_render_slot_is_held_while_content_is_generated(monkeypatch):
+    monkeypatch.setattr(render_pool, "max_workers", 1)
+    monkeypatch.setattr(render_pool, "queue_size", 0)
+    generating = asyncio.Event()
+    proceed = asyncio.Event()
+
+    async def _content(language):
+        generating.set()
+        await proceed.wait()
+        raise RuntimeError("LLM failed")
+
+    monkeypatch.setattr(services, "_generate_frenzy_content", _content)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with main.lifespan(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.get("/frenzy/Spanish"))
+                await generating.wait()
+                # The Spanish render is still waiting on content but owns the only slot
+                rejected = await asyncio.wait_for(client.get("/frenzy/French"), 5)
+                proceed.set()
+                failed = await first
+                held_after = render_pool.pending
+                retried = await client.get("/frenzy/French")
+                return rejected, failed, held_after, retried
+
+    rejected, failed, held_after, retried = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert "retry-after" in rejected.headers
+    # A failed generation gives its slot back
+    assert failed.status_code == 500
+    assert held_after == 0
+    assert retried.status_code == 500
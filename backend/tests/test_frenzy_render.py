@@ -0,0 +1,25 @@
+import os
+
+import frenzy_render
+
+
+def test_in_memory_fragments_never_touch_disk(monkeypatch):
+    monkeypatch.setattr(frenzy_render, "_memory_fragments", frenzy_render.OrderedDict())
+    monkeypatch.setattr(frenzy_render, "FRAGMENT_MAX_BYTES", 10)
+    renders = []
+
+    def render(data):
+        def _render():
+            renders.append(data)
+            return data
+        return _render
+
+    assert frenzy_render.FRENZY_IN_MEMORY
+    assert frenzy_render._fragment("Spanish", 1, "uno", render(b"day-one")) == b"day-one"
+    assert frenzy_render._fragment("Spanish", 1, "uno", render(b"other")) == b"day-one"
+    # Over the byte budget: the least recently used fragment is dropped
+    frenzy_render._fragment("Spanish", 2, "dos", render(b"day-two"))
+    frenzy_render._fragment("Spanish", 1, "uno", render(b"day-one"))
+
+    assert renders == [b"day-one", b"day-two", b"day-one"]
+    assert not os.path.exists(frenzy_render.FRAGMENT_DIR)
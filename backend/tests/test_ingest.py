@@ -0,0 +1,50 @@
+import os
+import asyncio
+
+import httpx
+import pytest
+
+import main
+import ingest
+
+BOUNDARY = "testboundary"
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+FILE_PART = (
+    f"--{BOUNDARY}\r\n"
+    'Content-Disposition: form-data; name="file"; filename="clip.mp4"\r\n'
+    "Content-Type: video/mp4\r\n\r\n"
+).encode() + b"\x00video bytes" * 100
+
+
+async def _post(path: str, body: bytes) -> httpx.Response:
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, content=body, headers=HEADERS)
+
+
+def _spool_files() -> set:
+    if not os.path.isdir(ingest.UPLOAD_SPOOL_DIR):
+        return set()
+    return set(os.listdir(ingest.UPLOAD_SPOOL_DIR))
+
+
+@pytest.mark.parametrize("path", ["/upload", "/jobs/upload"])
+def test_garbage_body_is_rejected(path):
+    before = _spool_files()
+    response = asyncio.run(_post(path, b"this is not multipart at all"))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Malformed multipart body."
+    assert _spool_files() == before
+
+
+@pytest.mark.parametrize("path", ["/upload", "/jobs/upload"])
+def test_truncated_body_is_rejected(path):
+    before = _spool_files()
+    # The file part never gets its closing boundary
+    response = asyncio.run(_post(path, FILE_PART))
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Upload was truncated."
+    assert _spool_files() == before
@@ -0,0 +1,66 @@
+import asyncio
+
+from services import _stream_json
+
+
+def _stream(text: str, expect: str | None = None, chunk: int = 3) -> tuple:
+    """
+    (parser, items passed to on_item) for `text` streamed in `chunk`-sized pieces.
+    """
+    async def chunks():
+        for i in range(0, len(text), chunk):
+            yield text[i:i + chunk]
+
+    streamed = []
+    parser = asyncio.run(_stream_json(chunks(), on_item=streamed.append, expect=expect))
+    return parser, streamed
+
+
+def test_code_fence_wins_over_brackets_in_the_prose():
+    text = 'Here are [5] questions:\n```json\n[{"question": "Hola?"}, {"question": "Adiós?"}]\n```'
+    for expect in (None, "array"):
+        parser, streamed = _stream(text, expect)
+        assert parser.done
+        assert parser.result() == [{"question": "Hola?"}, {"question": "Adiós?"}]
+        assert streamed == parser.result()
+
+
+def test_fenced_object_wins_over_an_object_in_the_prose():
+    text = 'Use the format {"day": N}:\n```json\n{"day": 1, "body": "Hola"}\n```'
+    parser, streamed = _stream(text, "object")
+    assert parser.result() == {"day": 1, "body": "Hola"}
+    assert streamed == [("day", 1), ("body", "Hola")]
+
+
+def test_json_after_prose_is_used_when_no_fence_follows():
+    parser, streamed = _stream('Sure! {"a": 1, "b": "x]"} and more', "object")
+    assert parser.done
+    assert parser.result() == {"a": 1, "b": "x]"}
+    assert streamed == [("a", 1), ("b", "x]")]
+
+
+def test_leading_json_streams_element_by_element():
+    text = '[{"q": "a,]"}, {"q": 2}] done'
+    fed = 0
+    seen_at = []
+
+    async def chunks():
+        nonlocal fed
+        for ch in text:
+            fed += 1
+            yield ch
+
+    async def run():
+        return await _stream_json(chunks(), on_item=lambda item: seen_at.append((fed, item)), expect="array")
+
+    parser = asyncio.run(run())
+    assert parser.result() == [{"q": "a,]"}, {"q": 2}]
+    # The first question is handed over at the comma after it, before the array closes
+    assert seen_at[0] == (text.index("}, ") + 2, {"q": "a,]"})
+
+
+def test_wrong_shapes_and_placeholders_are_skipped():
+    parser, _ = _stream('Here are [5] questions: [{"q": 1}]', "array")
+    assert parser.result() == [{"q": 1}]
+    parser, _ = _stream('Using [1, 2] and {name}: {"day": 1, "body": "Hola"}', "object")
+    assert parser.result() == {"day": 1, "body": "Hola"}
@@ -0,0 +1,74 @@
+import socket
+import asyncio
+
+import pytest
+
+from bench_fakes import FakeOpenRouter
+from openrouter import OpenRouterClient
+from services import _stream_json
+
+CALLS = 10
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def fake_openrouter():
+    server = FakeOpenRouter(port=_free_port(), latency=0.01, jitter=0.0)
+    server.start()
+    yield server
+    server.stop()
+
+
+async def _sequential_calls(server: FakeOpenRouter):
+    async with OpenRouterClient(base_url=server.base_url, http2=False) as client:
+        # The first call of each kind gets a 503 (Retry-After: 1) and is retried
+        server.fail_next = 1
+        for _ in range(CALLS):
+            assert await client.chat("test-model", "Say hi")
+        server.fail_next = 1
+        for _ in range(CALLS):
+            assert "".join([delta async for delta in client.stream_chat("test-model", "Say hi")])
+
+
+async def _parsed_stream_calls(server: FakeOpenRouter):
+    async with OpenRouterClient(base_url=server.base_url, http2=False) as client:
+        for _ in range(CALLS):
+            # The way services consumes streams: parsing stops when the JSON closes
+            parser = await _stream_json(client.stream_chat("test-model", "Plan please"), expect="object")
+            assert parser.done and "top_strengths" in parser.result()
+
+
+async def _concurrent_calls(client: OpenRouterClient):
+    await asyncio.gather(*(client.chat("test-model", "Say hi") for _ in range(CALLS * 2)))
+
+
+def test_sequential_calls_share_one_connection(fake_openrouter):
+    asyncio.run(_sequential_calls(fake_openrouter))
+
+    assert fake_openrouter.requests == 2 * CALLS + 2
+    assert len(fake_openrouter.connections) == 1
+
+
+def test_parsed_streams_share_one_connection(fake_openrouter):
+    asyncio.run(_parsed_stream_calls(fake_openrouter))
+
+    assert fake_openrouter.requests == CALLS
+    assert len(fake_openrouter.connections) == 1
+
+
+def test_concurrent_calls_stay_within_the_pool(fake_openrouter):
+    async def run():
+        async with OpenRouterClient(base_url=fake_openrouter.base_url, max_concurrency=4, http2=False) as client:
+            await _concurrent_calls(client)
+            # A second round reuses the connections the first one opened
+            await _concurrent_calls(client)
+
+    asyncio.run(run())
+
+    assert fake_openrouter.requests == 4 * CALLS
+    assert len(fake_openrouter.connections) <= 4
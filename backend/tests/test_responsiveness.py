@@ -0,0 +1,55 @@
+import time
+import random
+import asyncio
+import statistics
+
+import httpx
+
+import main
+import services
+from bench_fakes import FakeTwelveLabs
+
+UPLOADS = 20
+
+
+async def _root_latencies_during_uploads() -> tuple:
+    """
+    (latencies of GET / while UPLOADS uploads run, uploads still running
+    afterwards, upload statuses).
+    """
+    rng = random.Random(0)
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            async def upload():
+                # Distinct bytes so content-hash dedup does not collapse the uploads
+                data = rng.randbytes(256 * 1024)
+                response = await client.post("/upload", files={"file": ("clip.mp4", data, "video/mp4")})
+                return response.status_code
+
+            uploads = [asyncio.ensure_future(upload()) for _ in range(UPLOADS)]
+            # Let the uploads get past spooling and into indexing
+            await asyncio.sleep(0.3)
+
+            latencies = []
+            for _ in range(20):
+                start = time.perf_counter()
+                response = await client.get("/")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+                await asyncio.sleep(0.02)
+            in_flight = sum(1 for task in uploads if not task.done())
+
+            statuses = await asyncio.gather(*uploads)
+    return latencies, in_flight, statuses
+
+
+def test_root_stays_fast_while_uploads_are_in_flight(monkeypatch):
+    monkeypatch.setattr(services, "client", FakeTwelveLabs(latency=0.2, jitter=0.05, index_seconds=1.0))
+    latencies, in_flight, statuses = asyncio.run(_root_latencies_during_uploads())
+
+    # Indexing takes a second, so every upload was still running when / was measured
+    assert in_flight == UPLOADS
+    assert statistics.median(latencies) < 0.02
+    assert max(latencies) < 0.1
+    assert statuses == [200] * UPLOADS
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import './QuizDisplay.css';
-import { saveFeedback } from '../lib/feedback';
+import { getLearnerId, saveFeedback } from '../lib/feedback';
 
 interface QuizQuestion {
     question: string;
@@ -18,9 +18,14 @@ interface Feedback {
 interface QuizDisplayProps {
     quiz: QuizQuestion[];
     videoId: string;
+    // Server-side copy of the quiz; when set, only option indexes are sent for grading
+    quizId?: string;
 }
 
-const QuizDisplay: React.FC<QuizDisplayProps> = ({ quiz, videoId }) => {
+const QuizDisplay: React.FC<QuizDisplayProps> = ({ quiz: initialQuiz, videoId, quizId: initialQuizId }) => {
+    // Each retry gets a new sample from the video's question bank
+    const [quiz, setQuiz] = useState<QuizQuestion[]>(initialQuiz);
+    const [quizId, setQuizId] = useState<string | undefined>(initialQuizId);
     const [selectedAnswers, setSelectedAnswers] = useState<{ [key: number]: number }>({});
     const [submitted, setSubmitted] = useState(false);
     const [score, setScore] = useState(0);
@@ -62,6 +67,10 @@ const QuizDisplay: React.FC<QuizDisplayProps> = ({ quiz, videoId }) => {
         setScore(correctCount);
         setSubmitted(true);
 
+        const answerPayload = quizId
+            ? { quiz_id: quizId, answers: quiz.map((_, index) => selectedAnswers[index]) }
+            : { video_id: videoId, correct_answers: correctAnswers, wrong_answers: wrongAnswers };
+
         // Fetch feedback from backend
         setFeedbackLoading(true);
         try {
@@ -71,9 +80,8 @@ const QuizDisplay: React.FC<QuizDisplayProps> = ({ quiz, videoId }) => {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    video_id: videoId,
-                    correct_answers: correctAnswers,
-                    wrong_answers: wrongAnswers,
+                    ...answerPayload,
+                    learner_id: await getLearnerId(),
                 }),
             });
 
@@ -97,7 +105,20 @@ const QuizDisplay: React.FC<QuizDisplayProps> = ({ quiz, videoId }) => {
         }
     };
 
-    const handleRetry = () => {
+    const handleRetry = async () => {
+        try {
+            const learnerId = await getLearnerId();
+            const query = learnerId ? `?learner_id=${encodeURIComponent(learnerId)}` : '';
+            const response = await fetch(`http://127.0.0.1:8000/videos/${encodeURIComponent(videoId)}/quiz${query}`);
+            if (response.ok) {
+                const data = await response.json();
+                setQuiz(data.quiz);
+                setQuizId(data.quiz_id);
+            }
+        } catch (error) {
+            // Keep the current questions
+            console.error('Error fetching a new quiz:', error);
+        }
         setSelectedAnswers({});
         setSubmitted(false);
         setScore(0);
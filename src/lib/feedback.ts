@@ -14,6 +14,12 @@ export interface QuizFeedbackRow {
   created_at?: string
 }
 
+// Signed-in user's id, used by the backend to keep a rolling learner profile
+export async function getLearnerId(): Promise<string | null> {
+  const { data: { user } } = await supabase.auth.getUser()
+  return user?.id || null
+}
+
 export async function saveFeedback(feedback: FeedbackData): Promise<{ success: boolean; error?: string }> {
   const { data: { user } } = await supabase.auth.getUser()
   
@@ -5,8 +5,24 @@ export type RawVideo = {
   url: string
   displayName: string
   language: string
+  // Set once the backend has pre-indexed the video
+  videoId?: string | null
+  title?: string | null
+  topics?: string[] | null
 }
 
+type CatalogItem = {
+  name: string
+  url: string
+  displayName: string
+  language: string
+  video_id: string | null
+  title: string | null
+  topics: string[] | null
+}
+
+const CATALOG_URL = 'http://127.0.0.1:8000/catalog'
+
 function parseVideoFilename(filename: string): { displayName: string; language: string } {
   // Remove extension
   const nameWithoutExt = filename.replace(/\.[^.]+$/, '')
@@ -21,18 +37,48 @@ function parseVideoFilename(filename: string): { displayName: string; language:
   return { displayName: nameWithoutExt, language: 'Unknown' }
 }
 
-export async function fetchRawVideos(): Promise<RawVideo[]> {
+// One request to the backend, which signs URLs in batches and caches them
+async function fetchCatalog(): Promise<RawVideo[]> {
+  const response = await fetch(CATALOG_URL)
+  if (!response.ok) throw new Error(`Catalog request failed: ${response.status}`)
+  const { items }: { items: CatalogItem[] } = await response.json()
+  return items.map((item) => ({
+    name: item.name,
+    url: item.url,
+    displayName: item.displayName,
+    language: item.language,
+    videoId: item.video_id,
+    title: item.title,
+    topics: item.topics,
+  }))
+}
+
+// Straight from Supabase Storage, signing every file in one call
+async function fetchFromStorage(): Promise<RawVideo[]> {
   const { data: files, error } = await supabase.storage.from('rawVideos').list()
   if (error) throw error
 
+  const names = (files ?? []).filter((file) => file.id !== null).map((file) => file.name)
+  if (names.length === 0) return []
+
+  const { data: signed, error: signError } = await supabase.storage.from('rawVideos').createSignedUrls(names, 3600)
+  if (signError) throw signError
+
   const results: RawVideo[] = []
-  for (const file of files ?? []) {
-    if (file.id === null) continue
-    const { data } = await supabase.storage.from('rawVideos').createSignedUrl(file.name, 3600)
-    if (data?.signedUrl) {
-      const { displayName, language } = parseVideoFilename(file.name)
-      results.push({ name: file.name, url: data.signedUrl, displayName, language })
+  for (const entry of signed ?? []) {
+    if (entry.signedUrl && entry.path) {
+      const { displayName, language } = parseVideoFilename(entry.path)
+      results.push({ name: entry.path, url: entry.signedUrl, displayName, language })
     }
   }
   return results
 }
+
+export async function fetchRawVideos(): Promise<RawVideo[]> {
+  try {
+    return await fetchCatalog()
+  } catch (err) {
+    console.warn('Backend catalog unavailable, listing storage directly:', err)
+    return fetchFromStorage()
+  }
+}
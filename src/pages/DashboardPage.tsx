@@ -5,6 +5,7 @@ import { Navbar } from '../components/Layout/Navbar'
 import { VideoModal } from '../components/Video/VideoModal'
 import { PiPPlayer } from '../components/Video/PiPPlayer'
 import QuizDisplay from '../components/QuizDisplay'
+import { getLearnerId } from '../lib/feedback'
 
 export default function DashboardPage() {
   // Raw videos from storage
@@ -62,6 +63,9 @@ export default function DashboardPage() {
     try {
       const payload = new FormData()
       payload.append('url', video.url)
+      // Lets the backend skip bank questions this learner has already seen
+      const learnerId = await getLearnerId()
+      if (learnerId) payload.append('learner_id', learnerId)
 
       const response = await fetch('http://127.0.0.1:8000/upload-url', {
         method: 'POST',
@@ -427,7 +431,7 @@ export default function DashboardPage() {
                 </div>
               )}
               {quizData.quiz && Array.isArray(quizData.quiz) && quizData.quiz.length > 0 && (
-                <QuizDisplay quiz={quizData.quiz} videoId={quizData.video_id} />
+                <QuizDisplay quiz={quizData.quiz} videoId={quizData.video_id} quizId={quizData.quiz_id} />
               )}
             </>
           )}
@@ -23,13 +23,8 @@ export default function FrenzyPage() {
         setError(null)
 
         try {
-            const formData = new FormData()
-            formData.append('language', selectedLang)
-
-            const response = await fetch('http://127.0.0.1:8000/generate-frenzy', {
-                method: 'POST',
-                body: formData,
-            })
+            // GET so the browser cache can revalidate with the guide's ETag
+            const response = await fetch(`http://127.0.0.1:8000/frenzy/${encodeURIComponent(selectedLang)}`)
 
             if (!response.ok) {
                 throw new Error('Failed to generate PDF')
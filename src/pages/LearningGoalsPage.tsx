@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react'
 import { useAuth } from '../contexts/AuthContext'
 import { Navbar } from '../components/Layout/Navbar'
-import { fetchAllFeedback, type QuizFeedbackRow } from '../lib/feedback'
+import { fetchAllFeedback, getLearnerId, type QuizFeedbackRow } from '../lib/feedback'
 import './LearningGoalsPage.css'
 
 interface LearningPlan {
@@ -43,22 +43,41 @@ export default function LearningGoalsPage() {
     setError(null)
 
     try {
-      // Extract feedback data from each row
-      const feedbackList = feedbackHistory.map(row => row.feedback)
-      
-      const response = await fetch('http://127.0.0.1:8000/learning-plan', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          feedback_history: feedbackList,
-        }),
-      })
+      // The backend keeps a rolling profile per learner, so the full history
+      // only has to be sent once to seed it
+      const learnerId = await getLearnerId()
+      const seededKey = `learnerProfileSeeded:${learnerId}`
+      const requestPlan = (withHistory: boolean) =>
+        fetch('http://127.0.0.1:8000/learning-plan', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            learner_id: learnerId,
+            feedback_history: withHistory ? feedbackHistory.map(row => row.feedback) : [],
+          }),
+        })
+
+      const needsHistory = !learnerId || !localStorage.getItem(seededKey)
+      let response = await requestPlan(needsHistory)
+
+      if (response.status === 409 && !needsHistory) {
+        // The server lost the profile we seeded (e.g. its data was reset):
+        // forget that we seeded it and send the full history again
+        const body = await response.json().catch(() => null)
+        if (body?.detail === 'profile_missing') {
+          localStorage.removeItem(seededKey)
+          response = await requestPlan(true)
+        }
+      }
 
       if (!response.ok) {
         throw new Error('Failed to generate learning plan')
       }
+      if (learnerId) {
+        localStorage.setItem(seededKey, '1')
+      }
 
       const plan = await response.json()
       setLearningPlan(plan)